@@ -0,0 +1,187 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Benchmark suite for the custom lexers in epiccoder.lexer, run headless on the Qt offscreen platform.
+#
+# For each lexer/corpus pair it measures
+#   - full-document styling throughput (MB/s),
+#   - per-edit restyle latency (insert one character, restyle a screenful of lines from the edit), and
+#   - peak Python memory allocated while styling the whole document (tracemalloc), and
+#   - the hit rate of the PRS line style cache over the styling and edit passes.
+# Results are printed as a table and written to a JSON report that can be compared across releases.
+#
+# Run from the repository root:
+#   > python -m benchmarks.bench_lexers [--quick] [--output lexer_benchmark.json]
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.Qsci import QsciScintilla  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from benchmarks.corpora import make_prs, make_python, make_text  # noqa: E402
+from epiccoder.lexer import PPSCustomLexer, PyCustomLexer, TextCustomLexer  # noqa: E402
+from epiccoder.lexer_core import lex_pps_line_cached  # noqa: E402
+from epiccoder.version import __version__  # noqa: E402
+
+# lines restyled after each edit, roughly one screenful
+VISIBLE_LINES = 60
+
+
+def corpora(quick: bool) -> list[tuple[str, type, str]]:
+    """(name, lexer class, text) for every benchmark case."""
+    rule_counts = (1_000,) if quick else (1_000, 10_000, 100_000)
+    cases = [(f"prs_{n // 1000}k_rules", PPSCustomLexer, make_prs(n)) for n in rule_counts]
+    cases.append(("txt_data", TextCustomLexer, make_text(5_000 if quick else 20_000)))
+    cases.append(("py_source", PyCustomLexer, make_python(200 if quick else 1_000)))
+    return cases
+
+
+def new_editor(lexer_class, text: str) -> QsciScintilla:
+    editor = QsciScintilla()
+    editor.setUtf8(True)
+    editor.setLexer(lexer_class(editor))
+    editor.setText(text)
+    return editor
+
+
+def bench_full_styling(editor: QsciScintilla) -> dict:
+    size = editor.length()
+    t0 = time.perf_counter()
+    editor.SendScintilla(QsciScintilla.SCI_COLOURISE, 0, -1)
+    elapsed = time.perf_counter() - t0
+
+    return {
+        "bytes": size,
+        "lines": editor.lines(),
+        "style_seconds": elapsed,
+        "mb_per_second": size / 1e6 / elapsed if elapsed else None,
+    }
+
+
+def bench_memory(lexer_class, text: str) -> dict:
+    # separate pass on a fresh editor, tracemalloc slows styling down too much to time it at the same time
+    editor = new_editor(lexer_class, text)
+    tracemalloc.start()
+    editor.SendScintilla(QsciScintilla.SCI_COLOURISE, 0, -1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"peak_python_memory_mb": peak / 1e6}
+
+
+def bench_edits(editor: QsciScintilla, edits: int) -> dict:
+    rng = random.Random(0)
+    line_count = editor.lines()
+    latencies = []
+    for _ in range(edits):
+        line = rng.randrange(line_count)
+        pos = editor.positionFromLineIndex(line, 0)
+        visible_end = editor.positionFromLineIndex(min(line + VISIBLE_LINES, line_count - 1), 0)
+
+        editor.SendScintilla(QsciScintilla.SCI_INSERTTEXT, pos, b"x")
+        t0 = time.perf_counter()
+        # what Scintilla asks for when repainting: style from the edit to the end of the view
+        editor.SendScintilla(
+            QsciScintilla.SCI_COLOURISE, editor.SendScintilla(QsciScintilla.SCI_GETENDSTYLED), visible_end + 1
+        )
+        latencies.append(time.perf_counter() - t0)
+
+        editor.SendScintilla(QsciScintilla.SCI_DELETERANGE, pos, 1)
+        editor.SendScintilla(QsciScintilla.SCI_COLOURISE, editor.SendScintilla(QsciScintilla.SCI_GETENDSTYLED), -1)
+
+    latencies.sort()
+    return {
+        "edits": edits,
+        "edit_latency_ms_median": statistics.median(latencies) * 1000,
+        "edit_latency_ms_p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "edit_latency_ms_max": latencies[-1] * 1000,
+    }
+
+
+def line_cache_hit_rate():
+    info = lex_pps_line_cached.cache_info()
+    lookups = info.hits + info.misses
+    return info.hits / lookups if lookups else None
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return rss / 1e6 if platform.system() == "Darwin" else rss / 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the EPICcoder custom lexers.")
+    parser.add_argument("--quick", action="store_true", help="small corpora only (smoke test)")
+    parser.add_argument("--edits", type=int, default=50, help="number of single-character edits per corpus")
+    parser.add_argument("--output", default="lexer_benchmark.json", help="where to write the JSON report")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+
+    results = []
+    print(f"{'case':<20}{'lexer':<16}{'MB':>8}{'MB/s':>8}{'edit ms':>10}{'p95 ms':>10}{'peak MB':>10}{'hit %':>8}")
+    for name, lexer_class, text in corpora(args.quick):
+        lex_pps_line_cached.cache_clear()
+        editor = new_editor(lexer_class, text)
+        result = {"case": name, "lexer": lexer_class.__name__}
+        result.update(bench_full_styling(editor))
+        result.update(bench_edits(editor, args.edits))
+        result["line_cache_hit_rate"] = line_cache_hit_rate() if lexer_class is PPSCustomLexer else None
+        result.update(bench_memory(lexer_class, text))
+        results.append(result)
+        hit_rate = result["line_cache_hit_rate"]
+        print(
+            f"{name:<20}{lexer_class.__name__:<16}{result['bytes'] / 1e6:>8.2f}{result['mb_per_second']:>8.2f}"
+            f"{result['edit_latency_ms_median']:>10.2f}{result['edit_latency_ms_p95']:>10.2f}"
+            f"{result['peak_python_memory_mb']:>10.1f}"
+            f"{'-' if hit_rate is None else f'{hit_rate * 100:.1f}':>8}"
+        )
+
+    report = {
+        "epiccoder_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nreport written to {args.output}")
+
+    del app
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Regression check that styling stays linear in the input size.
+#
+# Each lexer core is run on inputs that double in size; the cost per byte of the largest input must stay
+# within --tolerance times the cost per byte of the smallest one.  A quadratic token stream (e.g. consuming
+# tokens with list.pop(0)) blows far past that.  Exits with status 1 on failure, so it can run in CI.
+#
+# Run from the repository root:
+#   > python -m benchmarks.bench_linearity [--steps 5] [--tolerance 2.0]
+
+import argparse
+import sys
+import time
+
+from benchmarks.corpora import make_prs, make_python, make_text
+from epiccoder.lexer_core import lex_pps, lex_python, lex_text
+
+
+def lex_pps_uncached(data: bytes) -> tuple[bytearray, int]:
+    # the corpus repeats a template, so through the line style cache this would mostly time cache hits
+    return lex_pps(data, cached=False)
+
+
+# (name, lexer, corpus generator, size argument of the smallest input)
+CASES = (
+    ("prs", lex_pps_uncached, make_prs, 250),
+    ("txt", lex_text, make_text, 5_000),
+    ("py", lex_python, make_python, 100),
+)
+
+
+def time_per_byte(lexer, data: bytes, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        lexer(data)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that lexer styling time grows linearly with input size.")
+    parser.add_argument("--steps", type=int, default=5, help="number of size doublings")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="allowed growth of the per-byte cost")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'lexer':<6}{'size MB':>10}{'ns/byte':>10}{'growth':>10}")
+    for name, lexer, make_corpus, base in CASES:
+        first = None
+        for step in range(args.steps):
+            data = make_corpus(base << step).encode("utf-8")
+            cost = time_per_byte(lexer, data)
+            first = first or cost
+            print(f"{name:<6}{len(data) / 1e6:>10.2f}{cost * 1e9:>10.1f}{cost / first:>10.2f}")
+        if cost / first > args.tolerance:
+            print(f"{name}: per-byte cost grew {cost / first:.1f}x, styling is no longer linear")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Literal fast path versus line-by-line regex matching in epiccoder.search_core.
+#
+# Scans a generated tree (see bench_search) in a single process with each query planned twice: once as usual
+# and once with the literal fast path turned off, checks that both find the same hits and prints the speedup.
+# With --all-matches every match on a line is a hit, not only the first.
+#
+# Run from the repository root:
+#   > python -m benchmarks.bench_query [--files 5000] [--root /tmp/search_tree] [--all-matches]
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_search import make_tree
+from epiccoder import search_core
+
+QUERIES = ("Send_To_Motor", "fixation ok", "visual_search", "no such text anywhere")
+
+
+def time_scan(paths: list[str], query: search_core.SearchQuery) -> tuple[float, list]:
+    t0 = time.perf_counter()
+    hits = search_core.scan_files(paths, query)
+    return time.perf_counter() - t0, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the literal search fast path.")
+    parser.add_argument("--files", type=int, default=5_000, help="number of files in the generated tree")
+    parser.add_argument("--root", help="directory for the generated tree (kept between runs)")
+    parser.add_argument("--all-matches", action="store_true", help="report every match on a line")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(args.root or tmp)
+        if not root.exists() or not any(root.iterdir()):
+            print(f"generating {args.files} files in {root} ...")
+            make_tree(root, args.files)
+        paths = list(search_core.walk_files(str(root), search_core.EXCLUDE_DIRS, search_core.EXCLUDE_FILES))
+
+        print(f"{'query':<24}{'regex s':>10}{'literal s':>11}{'speedup':>10}{'hits':>10}")
+        for pattern in QUERIES:
+            regex_time, regex_hits = time_scan(
+                paths, search_core.SearchQuery(pattern, fast_path=False, all_matches=args.all_matches)
+            )
+            literal_time, literal_hits = time_scan(
+                paths, search_core.SearchQuery(pattern, all_matches=args.all_matches)
+            )
+            assert literal_hits == regex_hits, f"fast path results differ for {pattern!r}"
+            print(
+                f"{pattern:<24}{regex_time:>10.3f}{literal_time:>11.3f}"
+                f"{regex_time / literal_time:>10.1f}{len(literal_hits):>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
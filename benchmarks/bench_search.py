@@ -0,0 +1,96 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Project search throughput versus the number of worker processes.
+#
+# Generates a tree of synthetic .prs/.txt/.py files in a temporary directory (or --root, reused if it already
+# exists) and times a full search with epiccoder.search_core for 1, 2, 4, ... workers up to the core count.
+#
+# Run from the repository root:
+#   > python -m benchmarks.bench_search [--files 50000] [--pattern "Send_To_Motor"] [--root /tmp/search_tree]
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpora import make_prs, make_python, make_text
+from epiccoder import search_core
+
+FILES_PER_DIR = 500
+
+
+def make_tree(root: Path, files: int) -> None:
+    contents = (
+        ("prs", make_prs(20)),
+        ("txt", make_text(200)),
+        ("py", make_python(5)),
+    )
+    for n in range(files):
+        suffix, text = contents[n % len(contents)]
+        directory = root / f"dir{n // FILES_PER_DIR:04d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"file{n:06d}.{suffix}").write_text(text)
+
+
+def worker_counts() -> list[int]:
+    counts = []
+    n = 1
+    while n < (os.cpu_count() or 1):
+        counts.append(n)
+        n *= 2
+    counts.append(os.cpu_count() or 1)
+    return counts
+
+
+def time_search(root: str, pattern: str, workers: int) -> tuple[float, int]:
+    with search_core.new_executor(workers) as executor:
+        # warm up the pool so process start-up is not part of the measurement
+        list(executor.map(abs, range(workers)))
+        t0 = time.perf_counter()
+        query = search_core.SearchQuery(pattern)
+        hits = sum(len(chunk) for chunk in search_core.search(root, query, executor, workers=workers))
+        return time.perf_counter() - t0, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel project search.")
+    parser.add_argument("--files", type=int, default=50_000, help="number of files in the generated tree")
+    parser.add_argument("--pattern", default="Send_To_Motor", help="search pattern")
+    parser.add_argument("--root", help="directory for the generated tree (kept between runs)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(args.root or tmp)
+        if not root.exists() or not any(root.iterdir()):
+            print(f"generating {args.files} files in {root} ...")
+            make_tree(root, args.files)
+
+        print(f"{'workers':>8}{'seconds':>10}{'files/s':>10}{'speedup':>10}{'hits':>10}")
+        base = None
+        for workers in worker_counts():
+            elapsed, hits = time_search(str(root), args.pattern, workers)
+            base = base or elapsed
+            print(f"{workers:>8}{elapsed:>10.2f}{args.files / elapsed:>10.0f}{base / elapsed:>10.2f}{hits:>10}")
+
+
+if __name__ == "__main__":
+    main()
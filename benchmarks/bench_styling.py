@@ -0,0 +1,102 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Styling throughput of the custom lexers, and the cost of pushing the resulting style bytes to Scintilla
+# one token at a time (setStyling) versus in a single SCI_SETSTYLINGEX call.
+#
+# Run from the repository root:
+#   > python -m benchmarks.bench_styling [--rules 2000] [--lines 20000]
+
+import argparse
+import os
+import time
+from itertools import groupby
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.Qsci import QsciScintilla  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from benchmarks.corpora import make_prs, make_text  # noqa: E402
+from epiccoder.lexer import PPSCustomLexer, TextCustomLexer  # noqa: E402
+
+
+def style_document(lexer_class, text: str):
+    editor = QsciScintilla()
+    editor.setUtf8(True)
+    lexer = lexer_class(editor)
+    editor.setLexer(lexer)
+    editor.setText(text)
+
+    t0 = time.perf_counter()
+    editor.SendScintilla(QsciScintilla.SCI_COLOURISE, 0, -1)
+    elapsed = time.perf_counter() - t0
+    return editor, lexer, elapsed
+
+
+def replay_per_token(editor: QsciScintilla, lexer, styles: bytes) -> float:
+    runs = [(style, len(list(group))) for style, group in groupby(styles)]
+    t0 = time.perf_counter()
+    lexer.startStyling(0)
+    for style, length in runs:
+        lexer.setStyling(length, style)
+    return time.perf_counter() - t0
+
+
+def replay_bulk(editor: QsciScintilla, lexer, styles: bytes) -> float:
+    t0 = time.perf_counter()
+    lexer.startStyling(0)
+    editor.SendScintilla(QsciScintilla.SCI_SETSTYLINGEX, len(styles), styles)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark custom lexer styling throughput.")
+    parser.add_argument("--rules", type=int, default=2_000, help="number of rules in the synthetic .prs file")
+    parser.add_argument("--lines", type=int, default=20_000, help="number of lines in the synthetic .txt file")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+
+    corpora = (
+        ("prs", PPSCustomLexer, make_prs(args.rules)),
+        ("txt", TextCustomLexer, make_text(args.lines)),
+    )
+
+    print(f"{'corpus':<8}{'size MB':>10}{'style s':>10}{'MB/s':>10}{'per-token s':>14}{'bulk s':>10}{'speedup':>10}")
+    for name, lexer_class, text in corpora:
+        editor, lexer, elapsed = style_document(lexer_class, text)
+        size = editor.length()
+        styles = bytes(editor.SendScintilla(QsciScintilla.SCI_GETSTYLEAT, i) for i in range(size))
+
+        per_token = replay_per_token(editor, lexer, styles)
+        bulk = replay_bulk(editor, lexer, styles)
+
+        mb = size / 1e6
+        print(
+            f"{name:<8}{mb:>10.2f}{elapsed:>10.3f}{mb / elapsed:>10.2f}"
+            f"{per_token:>14.4f}{bulk:>10.4f}{per_token / max(bulk, 1e-9):>10.1f}"
+        )
+
+    del app
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Correctness check for epiccoder.lexer.LazyStyler, run headless on the Qt offscreen platform.
+#
+# An editor with viewport-first styling goes through what a user does with a big file: open it, jump to the
+# end, let the idle passes run, scroll back up and make a few edits (a typed character, a pasted rule that
+# adds lines, a deleted parenthesis that changes the nesting of everything below).  Its style bytes and PRS
+# line states must then equal those of a second editor that styled the same final text in one
+# SCI_COLOURISE pass.  The remaining unstyled tail of the lazy editor is styled from Scintilla's own
+# end-styled position, the way painting it would, so styles it wrongly considers valid are not redone.
+#
+# Run from the repository root (exits with status 1 on a mismatch):
+#   > python -m benchmarks.check_lazy_styling [--rules 3000] [--lines 30000]
+
+import argparse
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.Qsci import QsciScintilla  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from benchmarks.corpora import make_prs, make_text  # noqa: E402
+from epiccoder.lexer import LazyStyler, PPSCustomLexer, TextCustomLexer  # noqa: E402
+
+# event loop turns allowed for the idle passes to finish
+MAX_IDLE_TURNS = 100_000
+
+
+def new_editor(lexer_class, lazy: bool) -> tuple[QsciScintilla, LazyStyler]:
+    editor = QsciScintilla()
+    editor.setUtf8(True)
+    editor.resize(900, 700)
+    lexer = lexer_class(editor)
+    editor.setLexer(lexer)
+    styler = LazyStyler(editor, lexer) if lazy else None
+    editor.show()
+    return editor, styler
+
+
+def settle(app: QApplication, editor: QsciScintilla) -> None:
+    """Paint the viewport (which styles it on demand) and process events."""
+    editor.viewport().repaint()
+    app.processEvents()
+
+
+def run_idle(app: QApplication, styler: LazyStyler) -> None:
+    turns = 0
+    while styler.timer.isActive() and turns < MAX_IDLE_TURNS:
+        app.processEvents()
+        turns += 1
+
+
+def jump_to_line(app: QApplication, editor: QsciScintilla, line: int) -> None:
+    editor.setCursorPosition(line, 0)
+    editor.ensureLineVisible(line)
+    settle(app, editor)
+
+
+def styles_of(editor: QsciScintilla) -> bytes:
+    return bytes(editor.SendScintilla(QsciScintilla.SCI_GETSTYLEAT, i) for i in range(editor.length()))
+
+
+def line_states_of(editor: QsciScintilla) -> list[int]:
+    return [editor.SendScintilla(QsciScintilla.SCI_GETLINESTATE, line) for line in range(editor.lines())]
+
+
+def insert_at_line(editor: QsciScintilla, line: int, text: str) -> None:
+    editor.insertAt(text, line, 0)
+
+
+def delete_first(editor: QsciScintilla, needle: str, from_line: int) -> None:
+    """Delete the first occurrence of needle at or after from_line."""
+    for line in range(from_line, editor.lines()):
+        index = editor.text(line).find(needle)
+        if index >= 0:
+            editor.setSelection(line, index, line, index + len(needle))
+            editor.removeSelectedText()
+            return
+
+
+def check(app: QApplication, name: str, lexer_class, text: str) -> bool:
+    editor, styler = new_editor(lexer_class, lazy=True)
+    editor.setText(text)
+    styler.start()
+    settle(app, editor)
+
+    last_line = editor.lines() - 1
+    middle = editor.lines() // 2
+
+    # open + jump to the end, before and after the idle passes
+    jump_to_line(app, editor, last_line)
+    run_idle(app, styler)
+
+    # scroll back up and edit: a typed character, a pasted rule (adds lines), a deleted '(' (nesting changes)
+    jump_to_line(app, editor, middle)
+    insert_at_line(editor, middle, "x")
+    settle(app, editor)
+    insert_at_line(editor, 3, "(Pasted_Rule\nIf\n(\n(Goal Do Paste)\n)\nThen\n(\n(Delete (Goal Do Paste))\n)\n)\n\n")
+    jump_to_line(app, editor, 3)
+    delete_first(editor, "(", middle // 2)
+    jump_to_line(app, editor, middle // 2)
+    # another jump to the end while idle passes are still pending
+    jump_to_line(app, editor, editor.lines() - 1)
+    run_idle(app, styler)
+
+    # style whatever is left from where Scintilla thinks styling ends, as painting it would
+    editor.SendScintilla(QsciScintilla.SCI_COLOURISE, editor.SendScintilla(QsciScintilla.SCI_GETENDSTYLED), -1)
+    lazy_styles = styles_of(editor)
+    lazy_states = line_states_of(editor)
+
+    reference, _ = new_editor(lexer_class, lazy=False)
+    reference.setText(editor.text())
+    reference.SendScintilla(QsciScintilla.SCI_COLOURISE, 0, -1)
+    full_styles = styles_of(reference)
+    full_states = line_states_of(reference)
+
+    ok = True
+    if lazy_styles != full_styles:
+        pos = next(i for i, (a, b) in enumerate(zip(lazy_styles, full_styles)) if a != b)
+        line = reference.SendScintilla(QsciScintilla.SCI_LINEFROMPOSITION, pos)
+        print(f"{name}: style mismatch at position {pos} (line {line + 1}): {reference.text(line)!r}")
+        ok = False
+    if lexer_class is PPSCustomLexer and lazy_states != full_states:
+        line = next(i for i, (a, b) in enumerate(zip(lazy_states, full_states)) if a != b)
+        print(f"{name}: line state mismatch at line {line + 1}: {reference.text(line)!r}")
+        ok = False
+    print(f"{name}: {'ok' if ok else 'FAILED'} ({editor.length()} bytes, {editor.lines()} lines)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check viewport-first styling against full styling.")
+    parser.add_argument("--rules", type=int, default=3_000, help="number of rules in the synthetic .prs file")
+    parser.add_argument("--lines", type=int, default=30_000, help="number of lines in the synthetic .txt file")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+
+    results = [
+        check(app, "prs", PPSCustomLexer, make_prs(args.rules)),
+        check(app, "txt", TextCustomLexer, make_text(args.lines)),
+    ]
+
+    del app
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Synthetic, deterministic corpora for the benchmarks: EPIC production rule files, tab separated
+# data/trace files and Python sources.
+
+import random
+
+RULE_TEMPLATE = """(Rule_{n}
+If
+(
+(Goal Do Visual_Search)
+(Step Look_At ?obj{n})
+(Visual ?obj{n} Color Red) ; only red objects
+(Not (Tag ?obj{n} Seen))
+(Motor Ocular Processor Free)
+)
+Then
+(
+(Delete (Step Look_At ?obj{n}))
+(Add (Step Wait_For ?obj{n}))
+(Send_To_Motor Ocular Perform Move ?obj{n})
+(Delay_Countdown {n})
+)
+)
+
+"""
+
+PYTHON_TEMPLATE = '''class Device{n}(Base):
+    """Synthetic device number {n}."""
+
+    def __init__(self, name, delay={n}):
+        super().__init__(name)
+        self.delay = delay
+        self.items = [i * 2 for i in range(10)]
+
+    def handle_event(self, event, *args, **kwargs):
+        if event == "start" and self.delay > 0:
+            print(f"starting {{self.name}}", len(args))
+            return max(self.delay, 1) % 7
+        # fall through to the default handler
+        return None
+
+
+'''
+
+
+def make_prs(rules: int) -> str:
+    return "// synthetic EPIC production rules\n" + "".join(RULE_TEMPLATE.format(n=n) for n in range(rules))
+
+
+def make_text(lines: int) -> str:
+    rng = random.Random(0)
+    return "".join(
+        f"{i}\ttrial_{i % 97}\t{rng.randint(0, 5000)}\tfixation ok\t{rng.random():.4f}\n" for i in range(lines)
+    )
+
+
+def make_python(classes: int) -> str:
+    return "import os\nimport sys\n\n\n" + "".join(PYTHON_TEMPLATE.format(n=n) for n in range(classes))
@@ -18,6 +18,8 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import functools
+import os
 from pathlib import Path
 from typing import Callable, Optional
 
@@ -29,10 +31,17 @@ from PyQt5.Qsci import QsciLexerPython
 from PyQt5.Qsci import QsciLexerCPP
 from PyQt5.Qsci import QsciAPIs
 
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import QByteArray, Qt
 from PyQt5.QtGui import QFont, QColor, QKeyEvent
 
-from epiccoder.lexer import PPSCustomLexer, TextCustomLexer
+from epiccoder.lexer import LazyStyler, PPSCustomLexer, TextCustomLexer
+from epiccoder.theme import get_theme
+
+
+@functools.lru_cache(maxsize=None)
+def autocompletion_words() -> list[str]:
+    """Builtin functions, keywords and the names of all modules importable from the current interpreter."""
+    return keyword.kwlist + dir(__builtins__) + [name for _, name, _ in pkgutil.iter_modules()]
 
 
 class CustomEditor(QsciScintilla):
@@ -50,6 +59,11 @@ class CustomEditor(QsciScintilla):
         self.file_path = file_path
         self.star_func = star_func
         self.changed = False
+        # copy of the document made by snapshot(), until the text changes
+        self.snapshot_bytes: Optional[QByteArray] = None
+        # codec the file was read with (see epiccoder.file_info) and is written back with; a "utf-8-sig" file
+        # keeps its byte order mark
+        self.encoding = "utf-8"
 
         # encoding
         self.setUtf8(True)
@@ -83,53 +97,14 @@ class CustomEditor(QsciScintilla):
         self.setEolMode(QsciScintilla.EolWindows)
         self.setEolVisibility(False)
 
-        # lexer for syntax highlighting
-
-        self.color1 = "#abb2bf"
-        self.color2 = "#282c34"
+        # lexer for syntax highlighting (colors and fonts come from the shared tables in epiccoder.theme)
 
         if self.file_path.suffix == ".py":
             self.pylexer = QsciLexerPython(self)
-
-            # Default Settings
-            self.pylexer.setDefaultColor(QColor(self.color1))
-            self.pylexer.setDefaultPaper(QColor(self.color2))
-            self.pylexer.setDefaultFont(QFont("Consolas", 14))
-
-            for i in range(50):
-                self.pylexer.setFont(QFont("Consolas", 14), i)
-
-            self.pylexer.setColor(QColor("#4397E0"), QsciLexerPython.Number)
-            self.pylexer.setColor(QColor("#F18622"), QsciLexerPython.Keyword)
-            self.pylexer.setColor(QColor("#91C71E"), QsciLexerPython.DoubleQuotedString)
-            self.pylexer.setColor(QColor("#91C71E"), QsciLexerPython.SingleQuotedString)
-            self.pylexer.setColor(QColor("#91C71E"), QsciLexerPython.TripleDoubleQuotedString)
-            self.pylexer.setColor(QColor("#91C71E"), QsciLexerPython.TripleSingleQuotedString)
-            self.pylexer.setColor(QColor("#F0A91D"), QsciLexerPython.FunctionMethodName)
-            self.pylexer.setColor(QColor("#8C8C8C"), QsciLexerPython.Comment)
-            self.pylexer.setColor(QColor("#8C8C8C"), QsciLexerPython.CommentBlock)
-            self.pylexer.setColor(QColor("#B45DD9"), QsciLexerPython.Identifier)
-
+            get_theme("python").apply(self.pylexer)
         elif self.file_path.suffix in (".h", ".c", ".cpp", ".hpp"):
             self.pylexer = QsciLexerCPP(self)
-
-            # Default Settings
-            self.pylexer.setDefaultColor(QColor(self.color1))
-            self.pylexer.setDefaultPaper(QColor(self.color2))
-            self.pylexer.setDefaultFont(QFont("Consolas", 14))
-
-            for i in range(50):
-                self.pylexer.setFont(QFont("Consolas", 14), i)
-
-            self.pylexer.setColor(QColor("#4397E0"), QsciLexerCPP.Number)
-            self.pylexer.setColor(QColor("#F18622"), QsciLexerCPP.Keyword)
-            self.pylexer.setColor(QColor("#91C71E"), QsciLexerCPP.DoubleQuotedString)
-            self.pylexer.setColor(QColor("#91C71E"), QsciLexerCPP.SingleQuotedString)
-            self.pylexer.setColor(QColor("#8C8C8C"), QsciLexerCPP.Comment)
-            self.pylexer.setColor(QColor("#8C8C8C"), QsciLexerCPP.CommentLine)
-            self.pylexer.setColor(QColor("#B45DD9"), QsciLexerCPP.Identifier)
-            self.pylexer.setColor(QColor("white"), QsciLexerCPP.Operator)
-
+            get_theme("cpp").apply(self.pylexer)
         elif self.file_path.suffix == ".prs":
             self.pylexer = PPSCustomLexer(self)
         else:
@@ -139,20 +114,18 @@ class CustomEditor(QsciScintilla):
 
         # Api (you can add autocompletion using this)
         self.api = QsciAPIs(self.pylexer)
-        for key in keyword.kwlist + dir(__builtins__):  # adding builtin functions and keywords
-            self.api.add(key)
-
-        for (
-            _,
-            name,
-            _,
-        ) in pkgutil.iter_modules():  # adding all modules names from current interpreter
-            self.api.add(name)
+        for word in autocompletion_words():
+            self.api.add(word)
 
         self.api.prepare()
 
         self.setLexer(self.pylexer)
 
+        # the custom lexers style the visible lines first and the rest of the document while idle
+        self.lazy_styler: Optional[LazyStyler] = None
+        if isinstance(self.pylexer, (PPSCustomLexer, TextCustomLexer)):
+            self.lazy_styler = LazyStyler(self, self.pylexer)
+
         # line numbers
         self.setMarginType(0, QsciScintilla.NumberMargin)
         self.setMarginWidth(0, "000")
@@ -167,13 +140,52 @@ class CustomEditor(QsciScintilla):
         self.got_first_change_event = False
         self.textChanged.connect(self.onTextChanged)
 
+    def setText(self, text: str) -> None:
+        super().setText(text)
+        if self.lazy_styler is not None:
+            self.lazy_styler.start()
+
     def keyPressEvent(self, e: QKeyEvent) -> None:
         if e.modifiers() == Qt.ControlModifier and e.key() == Qt.Key_Space:
             self.autoCompleteFromAll()
         else:
             return super().keyPressEvent(e)
 
+    def snapshot(self) -> QByteArray:
+        """
+        The document as UTF-8 bytes, for reading in another thread.  A single copy of the raw bytes (nothing
+        is decoded here), reused until the text changes again.
+        """
+        if self.snapshot_bytes is None:
+            contents = self.bytes(0, self.length())
+            # bytes() includes the terminating NUL of the text range
+            if contents.endsWith(b"\0"):
+                contents.chop(1)
+            self.snapshot_bytes = contents
+        return self.snapshot_bytes
+
+    def replace_document(self, text: str) -> None:
+        """
+        Change the document to text as a single undo step.  Only the stretch between the first and the last
+        difference is replaced, so styling, markers and the view outside it are left alone.
+        """
+        old = self.text()
+        prefix = len(os.path.commonprefix([old, text]))
+        suffix = len(os.path.commonprefix([old[prefix:][::-1], text[prefix:][::-1]]))
+        if prefix == len(old) == len(text):
+            return
+        start = len(old[:prefix].encode("utf8"))
+        end = start + len(old[prefix : len(old) - suffix].encode("utf8"))
+        replacement = text[prefix : len(text) - suffix].encode("utf8")
+
+        self.beginUndoAction()
+        self.SendScintilla(QsciScintilla.SCI_SETTARGETSTART, start)
+        self.SendScintilla(QsciScintilla.SCI_SETTARGETEND, end)
+        self.SendScintilla(QsciScintilla.SCI_REPLACETARGET, len(replacement), replacement)
+        self.endUndoAction()
+
     def onTextChanged(self):
+        self.snapshot_bytes = None
         # Ignore First Change Event
         if not self.got_first_change_event:
             self.got_first_change_event = True
@@ -0,0 +1,121 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# What kind of file a path holds: binary or text, and for text its encoding and line endings.
+#
+# The answer is worked out from the start of the file and cached on the file's (mtime, size), so opening a
+# tab, searching and indexing look at a file's contents at most once per change between them.  Callers that
+# read the file anyway hand its bytes to classify_bytes() instead of having it read again.
+
+import codecs
+import os
+import threading
+from typing import Optional
+
+# a NUL byte in this much of the start of a file makes it binary
+BINARY_SNIFF_SIZE = 1024
+# encoding and line endings are worked out from this much of the start of a file
+SNIFF_SIZE = 64 * 1024
+
+# entries kept before the cache is emptied and starts over
+MAX_ENTRIES = 200_000
+
+
+class FileInfo:
+    __slots__ = ("binary", "encoding", "line_ending")
+
+    def __init__(self, binary: bool, encoding: Optional[str] = None, line_ending: Optional[str] = None):
+        self.binary = binary
+        # codec name for open()/decode() of a text file
+        self.encoding = encoding
+        # "\n", "\r\n" or "\r", whichever is most common; None if the start of the file has no line break
+        self.line_ending = line_ending
+
+    def __repr__(self):
+        return f"FileInfo(binary={self.binary}, encoding={self.encoding!r}, line_ending={self.line_ending!r})"
+
+
+def sniff(sample: bytes) -> FileInfo:
+    """Classify a file from the first SNIFF_SIZE bytes of it."""
+    if b"\0" in sample[:BINARY_SNIFF_SIZE]:
+        return FileInfo(True)
+
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+    else:
+        try:
+            # a multi-byte character cut off at the end of the sample is not an error
+            codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            # every byte sequence decodes as latin-1
+            encoding = "latin-1"
+
+    crlf = sample.count(b"\r\n")
+    counts = {"\r\n": crlf, "\n": sample.count(b"\n") - crlf, "\r": sample.count(b"\r") - crlf}
+    line_ending = max(counts, key=counts.get) if any(counts.values()) else None
+    return FileInfo(False, encoding, line_ending)
+
+
+class FileClassifier:
+    """FileInfo of paths, cached on (mtime, size); safe to share between threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cache: dict[str, tuple[tuple[int, int], FileInfo]] = {}
+
+    @staticmethod
+    def key(st: os.stat_result) -> tuple[int, int]:
+        return st.st_mtime_ns, st.st_size
+
+    def cached(self, path: str, st: os.stat_result) -> Optional[FileInfo]:
+        entry = self.cache.get(path)
+        return entry[1] if entry is not None and entry[0] == self.key(st) else None
+
+    def store(self, path: str, st: os.stat_result, info: FileInfo) -> FileInfo:
+        with self.lock:
+            if len(self.cache) >= MAX_ENTRIES:
+                self.cache.clear()
+            self.cache[path] = (self.key(st), info)
+        return info
+
+    def classify(self, path: str) -> Optional[FileInfo]:
+        """FileInfo of path, None if it can't be read."""
+        try:
+            st = os.stat(path)
+            info = self.cached(path, st)
+            if info is not None:
+                return info
+            with open(path, "rb") as f:
+                sample = f.read(SNIFF_SIZE)
+        except OSError:
+            return None
+        return self.store(path, st, sniff(sample))
+
+    def classify_bytes(self, path: str, st: os.stat_result, data) -> FileInfo:
+        """FileInfo of path from its contents (or a start of them) already in memory; st is its stat result."""
+        info = self.cached(path, st)
+        if info is None:
+            info = self.store(path, st, sniff(data[:SNIFF_SIZE]))
+        return info
+
+
+# shared by the whole process (search worker processes each have their own)
+file_classifier = FileClassifier()
@@ -0,0 +1,236 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import threading
+from typing import Optional
+
+from PyQt5.QtCore import QFileSystemWatcher, QThread, QTimer, pyqtSignal
+
+from epiccoder.search_core import EXCLUDE_FILES, exclude_dirs_for, normalized_path
+from epiccoder.search_index import user_cache_dir
+from epiccoder.watch_core import TreeSnapshot
+
+
+class ProjectWatcher(QThread):
+    """
+    Watches the project folder for files being added, changed or removed (by the editor, EPICpy, git, ...) and
+    reports them in batches, so the search index and quick open can update just those files instead of
+    walking the whole folder again.
+
+    The folder is scanned in the background when watch() is called; after that every directory, and every file
+    up to MAX_WATCHED_PATHS, is watched with a QFileSystemWatcher.  Events are collected for COALESCE_MS and
+    then sent as one batch, so a burst of writes (a simulation run, a checkout) costs one update.  A folder
+    with more than MAX_SCANNED_PATHS directories and files is not watched at all.  The editor's cache
+    directory is left out, so writing the search index there does not report a change of the project.
+
+    The scan and the comparison of changed directories with the snapshot (which lists them and takes in new
+    subtrees) run on this thread; the GUI thread only collects events, adds and removes watches, and emits.
+    """
+
+    # full paths of the files added, changed or removed since the last batch
+    changed = pyqtSignal(list)
+    # root: watching started; changes made while it was being scanned may have been missed
+    watching = pyqtSignal(str)
+
+    COALESCE_MS = 300
+
+    # platforms limit watches (inotify) or open files (kqueue); directories are watched first
+    MAX_WATCHED_PATHS = 20_000
+
+    # the background scan gives up on a folder bigger than this
+    MAX_SCANNED_PATHS = 200_000
+
+    def __init__(self):
+        super(ProjectWatcher, self).__init__(None)
+        self.root: Optional[str] = None
+        self.snapshot: Optional[TreeSnapshot] = None
+        # whether every directory and file below root is watched
+        self.complete = False
+
+        # the background scan: the root asked for, whether it still has to be scanned and, once done, (root,
+        # snapshot, directories, files); the snapshot is None for a folder too big to watch
+        self.pending_root: Optional[str] = None
+        self.scan_requested = False
+        self.scanned: Optional[tuple[str, Optional[TreeSnapshot], list[str], list[str]]] = None
+
+        # batches of events handed to the thread: (snapshot, directories, files), and what it made of them:
+        # (snapshot, files changed, paths to watch, paths to stop watching)
+        self.batches: list[tuple[TreeSnapshot, set[str], set[str]]] = []
+        self.results: list[tuple[TreeSnapshot, set[str], list[str], list[str]]] = []
+        # the directories and files of the batches not applied yet
+        self.in_progress: set[str] = set()
+        self.batch_lock = threading.Lock()
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.directory_changed)
+        self.watcher.fileChanged.connect(self.file_changed)
+        self.changed_dirs: set[str] = set()
+        self.changed_files: set[str] = set()
+
+        self.coalesce_timer = QTimer(self)
+        self.coalesce_timer.setSingleShot(True)
+        self.coalesce_timer.setInterval(self.COALESCE_MS)
+        self.coalesce_timer.timeout.connect(self.flush)
+
+        self.finished.connect(self.apply_results)
+
+    def covers(self, root: str) -> bool:
+        """Whether every change below root is being reported."""
+        return self.complete and self.root is not None and normalized_path(self.root) == normalized_path(root)
+
+    def watch(self, root: str):
+        """Stop watching the current folder and watch root instead."""
+        self.pending_root = root
+        self.scan_requested = True
+        if not self.isRunning():
+            self.start()
+
+    def unwatch(self):
+        """Stop watching (and drop a scan still running, which stops at its next directory)."""
+        self.pending_root = None
+        self.scan_requested = False
+        self.stop_watching()
+        self.root = None
+
+    def stop_watching(self):
+        self.coalesce_timer.stop()
+        self.changed_dirs.clear()
+        self.changed_files.clear()
+        with self.batch_lock:
+            self.batches.clear()
+            self.in_progress.clear()
+        watched = self.watcher.directories() + self.watcher.files()
+        if watched:
+            self.watcher.removePaths(watched)
+        self.snapshot = None
+        self.complete = False
+
+    def run(self):
+        if self.scan_requested:
+            self.scan_requested = False
+            root = self.pending_root
+            # the same scope as the search index (epiccoder.search_index.TrigramIndex)
+            snapshot = TreeSnapshot(root, exclude_dirs_for(True), EXCLUDE_FILES, [str(user_cache_dir())])
+            found = snapshot.add(root, self.MAX_SCANNED_PATHS, is_cancelled=lambda: self.pending_root != root)
+            if found is None:
+                self.scanned = (root, None, [], [])
+            else:
+                self.scanned = (root, snapshot, *found)
+            return
+
+        while True:
+            with self.batch_lock:
+                if not self.batches:
+                    break
+                snapshot, dirs, files = self.batches.pop(0)
+            changed = set()
+            watch, unwatch = [], []
+            # directories first: they take in new files, which may also be reported changed
+            for directory in dirs:
+                dir_files, to_watch, to_unwatch = snapshot.directory_changed(directory)
+                changed.update(dir_files)
+                watch.extend(to_watch)
+                unwatch.extend(to_unwatch)
+            for path in files:
+                changed.add(path)
+                # a file replaced by renaming another over it is dropped by the watcher; watch the new one
+                if snapshot.file_changed(path) and path not in unwatch:
+                    watch.append(path)
+            with self.batch_lock:
+                self.results.append((snapshot, changed, watch, unwatch))
+
+    def apply_results(self):
+        if self.scanned is not None:
+            self.start_watching()
+        with self.batch_lock:
+            results, self.results = self.results, []
+            if not self.batches:
+                self.in_progress.clear()
+        changed = set()
+        for snapshot, files, watch, unwatch in results:
+            if snapshot is self.snapshot:
+                changed.update(files)
+                self.update_watches(watch, unwatch)
+        if changed:
+            self.changed.emit(sorted(changed))
+        # work that came in while the thread was on its way out
+        if self.scan_requested or self.batches:
+            self.start()
+
+    def start_watching(self):
+        root, snapshot, dirs, files = self.scanned
+        self.scanned = None
+        if self.pending_root is None:
+            # unwatch() was called while this folder was being scanned
+            return
+        if root != self.pending_root:
+            # asked for another folder while this one was being scanned
+            self.scan_requested = True
+            return
+
+        self.stop_watching()
+        self.root = root
+        if snapshot is None:
+            return
+        self.snapshot = snapshot
+        paths = (dirs + files)[: self.MAX_WATCHED_PATHS]
+        failed = self.watcher.addPaths(paths) if paths else []
+        self.complete = len(paths) == len(dirs) + len(files) and not failed
+        self.watching.emit(root)
+
+    def pending_changes(self) -> set[str]:
+        """The directories and files seen changing that are not reported yet."""
+        with self.batch_lock:
+            return self.changed_dirs | self.changed_files | self.in_progress
+
+    def directory_changed(self, path: str):
+        self.changed_dirs.add(path)
+        if not self.coalesce_timer.isActive():
+            self.coalesce_timer.start()
+
+    def file_changed(self, path: str):
+        self.changed_files.add(path)
+        if not self.coalesce_timer.isActive():
+            self.coalesce_timer.start()
+
+    def flush(self):
+        """Hand the events collected to the thread."""
+        if self.snapshot is None or not (self.changed_dirs or self.changed_files):
+            return
+        with self.batch_lock:
+            self.batches.append((self.snapshot, self.changed_dirs, self.changed_files))
+            self.in_progress.update(self.changed_dirs, self.changed_files)
+        self.changed_dirs = set()
+        self.changed_files = set()
+        if not self.isRunning():
+            self.start()
+
+    def update_watches(self, watch: list[str], unwatch: list[str]):
+        watched = set(self.watcher.directories()) | set(self.watcher.files())
+        unwatch = [path for path in unwatch if path in watched]
+        if unwatch:
+            self.watcher.removePaths(unwatch)
+        watch = [path for path in watch if path not in watched]
+        room = self.MAX_WATCHED_PATHS - (len(watched) - len(unwatch))
+        if len(watch) > room:
+            self.complete = False
+            watch = watch[: max(room, 0)]
+        if watch and self.watcher.addPaths(watch):
+            self.complete = False
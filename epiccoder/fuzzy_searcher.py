@@ -18,113 +18,571 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from typing import Optional
+from concurrent.futures import BrokenExecutor, Executor
+from typing import Callable, Optional
 
-from PyQt5.QtCore import QThread, pyqtSignal
-from PyQt5.QtWidgets import QListWidgetItem
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, QThread, QTimer, Qt, pyqtSignal
 
-import os
-from pathlib import Path
 import re
+import threading
+import time
 
+from epiccoder import replace_core, search_core
+from epiccoder.search_index import TrigramIndex
 
-class SearchItem(QListWidgetItem):
-    def __init__(self, name, full_path, lineno, end, line):
-        self.name = name
-        self.full_path = full_path
-        self.lineno = lineno
-        self.end = end
-        self.line = line
-        self.formatted = f"{self.name}:{self.lineno}:{self.end} - {self.line} ..."
-        super().__init__(self.formatted)
 
-    def __str__(self):
-        return self.formatted
+class SearchResultsModel(QAbstractItemModel):
+    """
+    Search results grouped by file: one top-level row per file showing its match count, with a child row per
+    match.  Hits are kept in a compact search_core.HitStore and the text of a row is only formatted when the
+    view asks for it, i.e. for the rows on screen, so a collapsed file costs nothing beyond its own row.
 
-    def __repr__(self):
-        return self.formatted
+    While a replacement is set (see set_replacement()) the rows are a dry run of it: every match row shows the
+    replaced text and has a check box to accept or reject it, and a file row checks or unchecks all of its
+    matches.
+    """
 
+    def __init__(self, parent=None):
+        super(SearchResultsModel, self).__init__(parent)
+        self.hits = search_core.HitStore()
+        # internal pointer of the child rows of each file (file rows have None): the file id, kept alive here
+        self.file_refs: list[int] = []
+        # the search pattern the hits were found with
+        self.pattern: Optional[str] = None
+        # dry run of replacing the hits: the pattern compiled for it, the replacement template, and a flag per hit
+        self.replace_reg: Optional[re.Pattern] = None
+        self.replacement: Optional[str] = None
+        self.rejected = bytearray()
+        # why the replacement can't be applied (e.g. it names an unknown group), None if it can
+        self.replacement_error: Optional[str] = None
 
-class SearchWorker(QThread):
-    finished = pyqtSignal(list)
+    def index(self, row: int, column: int, parent=QModelIndex()) -> QModelIndex:
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, None)
+        return self.createIndex(row, column, self.file_refs[parent.row()])
+
+    def parent(self, index: QModelIndex) -> QModelIndex:
+        file_id = index.internalPointer() if index.isValid() else None
+        if file_id is None:
+            return QModelIndex()
+        return self.createIndex(file_id, 0, None)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        if not parent.isValid():
+            return len(self.hits.paths)
+        if parent.internalPointer() is None:
+            return self.hits.file_counts[parent.row()]
+        return 0
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 1
+
+    def hit_row(self, index: QModelIndex) -> int:
+        """Position in the HitStore of the hit of a match row."""
+        return self.hits.file_firsts[index.internalPointer()] + index.row()
+
+    def file_check_state(self, file_id: int) -> Qt.CheckState:
+        first = self.hits.file_firsts[file_id]
+        rejected = self.rejected.count(1, first, first + self.hits.file_counts[file_id])
+        if rejected == 0:
+            return Qt.Checked
+        return Qt.Unchecked if rejected == self.hits.file_counts[file_id] else Qt.PartiallyChecked
+
+    def replacing(self) -> bool:
+        return self.replace_reg is not None
+
+    def replaced_preview(self, preview: str) -> str:
+        try:
+            return self.replace_reg.sub(self.replacement, preview, count=1)
+        except (re.error, IndexError):
+            return preview
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        file_id = index.internalPointer()
+        if role == Qt.DisplayRole:
+            if file_id is None:
+                return self.hits.format_file(index.row())
+            if not self.replacing():
+                return self.hits.format_file_hit(file_id, index.row())
+            _, _, lineno, _, end, preview = self.hits.file_hit(file_id, index.row())
+            return f"{lineno}:{end} - {preview} \u2192 {self.replaced_preview(preview)}"
+        if role == Qt.ToolTipRole and file_id is None:
+            return self.hits.paths[index.row()]
+        if role == Qt.CheckStateRole and self.replacing():
+            if file_id is None:
+                return self.file_check_state(index.row())
+            return Qt.Unchecked if self.rejected[self.hit_row(index)] else Qt.Checked
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        flags = super(SearchResultsModel, self).flags(index)
+        if index.isValid() and self.replacing():
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def setData(self, index: QModelIndex, value, role=Qt.EditRole) -> bool:
+        if not index.isValid() or role != Qt.CheckStateRole or not self.replacing():
+            return False
+        rejected = 0 if value == Qt.Checked else 1
+        file_id = index.internalPointer()
+        if file_id is None:
+            file_id = index.row()
+            first = self.hits.file_firsts[file_id]
+            count = self.hits.file_counts[file_id]
+            self.rejected[first : first + count] = bytes([rejected]) * count
+            self.dataChanged.emit(self.index(0, 0, index), self.index(count - 1, 0, index), [Qt.CheckStateRole])
+            file_row = index
+        else:
+            self.rejected[self.hit_row(index)] = rejected
+            self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+            file_row = self.parent(index)
+        self.dataChanged.emit(file_row, file_row, [Qt.CheckStateRole])
+        return True
+
+    def set_replacement(self, replacement: Optional[str]):
+        """Show the results as a dry run of replacing them with replacement (None: plain search results)."""
+        self.replacement = replacement
+        self.replace_reg = None
+        self.replacement_error = None
+        if replacement is not None and self.pattern:
+            try:
+                reg = re.compile(self.pattern, re.IGNORECASE)
+            except re.error:
+                reg = None
+            if reg is not None:
+                try:
+                    # checks the template: a bad group reference raises re.error, an unknown group name IndexError
+                    reg.sub(replacement, "")
+                except (re.error, IndexError) as e:
+                    self.replacement_error = str(e)
+                else:
+                    self.replace_reg = reg
+        self.layoutAboutToBeChanged.emit()
+        self.layoutChanged.emit()
+
+    def accepted_spans(self) -> dict[str, list[replace_core.Span]]:
+        """The hits still accepted in the dry run, as replace_core spans by file."""
+        spans = {}
+        hits = self.hits
+        for row in range(len(hits)):
+            if not self.rejected[row]:
+                path = hits.paths[hits.file_ids[row]]
+                spans.setdefault(path, []).append((hits.linenos[row], hits.starts[row], hits.ends[row]))
+        return spans
+
+    def hit(self, index: QModelIndex) -> search_core.Hit:
+        """The hit of a match row, or the first hit in the file of a file row."""
+        file_id = index.internalPointer()
+        if file_id is None:
+            return self.hits.file_hit(index.row(), 0)
+        return self.hits.file_hit(file_id, index.row())
+
+    def clear(self, pattern: Optional[str] = None):
+        """Drop all hits; the next ones are found with pattern."""
+        self.beginResetModel()
+        self.hits.clear()
+        self.file_refs = []
+        self.rejected = bytearray()
+        self.pattern = pattern
+        self.endResetModel()
+        self.set_replacement(self.replacement)
+
+    def append_hits(self, hits: list):
+        if not hits:
+            return
+        paths = self.hits.paths
+        # hits for the file shown last become more children of it, the others are new files
+        continued = 0
+        while continued < len(hits) and paths and hits[continued][1] == paths[-1]:
+            continued += 1
+        if continued:
+            file_row = self.createIndex(len(paths) - 1, 0, None)
+            first = self.hits.file_counts[-1]
+            self.beginInsertRows(file_row, first, first + continued - 1)
+            self.hits.extend(hits[:continued])
+            self.rejected.extend(bytes(continued))
+            self.endInsertRows()
+            self.dataChanged.emit(file_row, file_row)
+        if continued < len(hits):
+            first_file = len(paths)
+            new_files = sum(1 for i in range(continued, len(hits)) if i == continued or hits[i][1] != hits[i - 1][1])
+            self.beginInsertRows(QModelIndex(), first_file, first_file + new_files - 1)
+            self.hits.extend(hits[continued:])
+            self.rejected.extend(bytes(len(hits) - continued))
+            self.file_refs.extend(range(len(self.file_refs), len(paths)))
+            self.endInsertRows()
+
+
+class IndexWorker(QThread):
+    """Builds and refreshes the trigram index of the current project folder in the background."""
+
+    # message for the status bar: refreshing or updating the index failed (searches then scan every file)
+    failed = pyqtSignal(str)
 
     def __init__(self):
+        super(IndexWorker, self).__init__(None)
+        self.index: Optional[TrigramIndex] = None
+        self.pending_root: Optional[str] = None
+        # files reported changed (see update()), taken by the thread under the lock
+        self.pending_paths: set[str] = set()
+        # the files update_files() is working on
+        self.applying: set[str] = set()
+        self.pending_lock = threading.Lock()
+        self.stopping = False
+        # work queued while the thread was on its way out
+        self.finished.connect(self.start_pending)
+
+    def unapplied_paths(self) -> set[str]:
+        """The files reported changed (see update()) that may not be re-indexed yet."""
+        with self.pending_lock:
+            return self.pending_paths | self.applying
+
+    def index_for(self, root: str) -> Optional[TrigramIndex]:
+        """The index of root if it is usable for queries, None if it is missing or still being built."""
+        index = self.index
+        return index if index is not None and index.root == root and index.ready else None
+
+    def refresh(self, root: str):
+        """Bring the index of root up to date (a different root replaces the current index)."""
+        self.pending_root = root
+        if not self.isRunning():
+            self.start()
+
+    def update(self, paths: list):
+        """Re-index just these files (added, changed or removed) of the current index."""
+        with self.pending_lock:
+            self.pending_paths.update(paths)
+        if not self.isRunning():
+            self.start()
+
+    def start_pending(self):
+        if not self.stopping and (self.pending_root is not None or self.pending_paths):
+            self.start()
+
+    def stop(self):
+        """Drop queued work and stop a refresh at its next file (wait() for the thread afterwards)."""
+        self.stopping = True
+
+    def run(self):
+        while not self.stopping:
+            with self.pending_lock:
+                paths, self.pending_paths = self.pending_paths, set()
+                self.applying = paths
+            # an exception escaping QThread.run() would end the editor
+            try:
+                if self.pending_root is not None:
+                    # a refresh looks at every file anyway
+                    root, self.pending_root = self.pending_root, None
+                    if self.index is None or self.index.root != root:
+                        self.index = TrigramIndex(root)
+                    index = self.index
+                    index.refresh(is_cancelled=lambda: self.stopping or self.pending_root not in (None, root))
+                elif paths:
+                    if self.index is not None and self.index.ready:
+                        self.index.update_files(paths)
+                else:
+                    break
+            except Exception as e:
+                self.index = None
+                self.failed.emit(f"Indexing failed: {e}")
+            finally:
+                with self.pending_lock:
+                    self.applying = set()
+
+
+class SearchWorker(QThread):
+    # (generation, hits): the next batch of hits found by the search started for that generation of the query
+    found = pyqtSignal(int, list)
+    # generation of a search that ran to completion (or failed)
+    finished = pyqtSignal(int)
+    # message for the status bar: the search failed, e.g. a worker process died
+    failed = pyqtSignal(str)
+
+    # quiet time after the last keystroke before a search starts
+    DEBOUNCE_MS = 250
+
+    # found items are sent to the GUI at least this often (seconds), or as soon as this many have piled up
+    BATCH_INTERVAL = 0.05
+    BATCH_SIZE = 500
+
+    # total search limit
+    MAX_RESULTS = 500_000
+
+    def __init__(self, workers: Optional[int] = None):
         super(SearchWorker, self).__init__(None)
-        self.items = []
+
+        # files are scanned on a pool of worker processes, created on the first search and kept for later ones
+        self.workers = workers
+        self.executor: Optional[Executor] = None
+        self.executor_lock = threading.Lock()
+        self.index_worker = IndexWorker()
         self.search_path: Optional[str] = None
         self.search_text: Optional[str] = None
         self.search_project: Optional[bool] = None
+        self.all_matches: bool = False
+
+        # returns snapshots of the editors with unsaved changes (full path -> UTF-8 contents); those are
+        # searched instead of the files on disk.  Called on the GUI thread when a search starts.
+        self.unsaved_buffers: Callable[[], dict] = dict
+
+        # whether changes below a folder are reported by a file watcher (which then keeps the index current);
+        # if not, the index is refreshed after every search
+        self.is_watched: Callable[[str], bool] = lambda root: False
+        # the files and directories the watcher has seen change but not reported yet.  Called on the GUI
+        # thread when a search starts in a watched folder.
+        self.unreported_changes: Callable[[], set] = set
+
+        # bumped by every update(); a running search whose generation is no longer current stops early and
+        # its results are dropped by the receiver
+        self.generation: int = 0
+
+        # the thread keeps running between searches and takes the next one from here, so starting a search
+        # never waits for the previous one to notice it is stale: (generation, text, path, search_project,
+        # all_matches, buffers, changed)
+        self.pending: Optional[tuple] = None
+        self.pending_condition = threading.Condition()
+        self.stopping = False
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(self.DEBOUNCE_MS)
+        self.debounce_timer.timeout.connect(self.start_search)
+
+    def is_stale(self, generation: int) -> bool:
+        return generation != self.generation
 
-    @staticmethod
-    def is_binary(path):
+    def pool(self) -> Executor:
+        """The process pool files are scanned on (also used by ReplaceWorker)."""
+        with self.executor_lock:
+            if self.executor is None:
+                self.executor = search_core.new_executor(self.workers)
+            return self.executor
+
+    def drop_pool(self):
+        """Let go of a broken process pool (a worker process died); the next pool() starts a new one."""
+        with self.executor_lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+    def search(
+        self,
+        generation: int,
+        search_text: str,
+        search_path: str,
+        search_project: bool,
+        all_matches: bool = False,
+        buffers: Optional[dict] = None,
+        changed: Optional[set] = None,
+    ):
         """
-        Check if file is binary
+        Search and emit the hits.  changed: for a watched folder, the files and directories that changed but
+        may not be in the index yet (see TrigramIndex.candidates()); None for a folder that isn't watched.
         """
+        debug = False
+        found = 0
+        executor = self.pool()
+
+        batch = []
+        last_flush = time.monotonic()
+
+        def flush(force: bool = False):
+            nonlocal batch, last_flush
+            if not batch:
+                return
+            if force or len(batch) >= self.BATCH_SIZE or time.monotonic() - last_flush >= self.BATCH_INTERVAL:
+                self.found.emit(generation, batch)
+                batch = []
+                last_flush = time.monotonic()
+
         try:
-            with open(path, "rb") as f:
-                return b"\0" in f.read(1024)
-        except FileNotFoundError:
-            return False
+            query = search_core.SearchQuery(search_text, all_matches=all_matches)
+        except re.error as e:
+            if debug:
+                print(e)
+            query = None
 
-    @staticmethod
-    def walkdir(path, exclude_dirs: list, exclude_files: list):
-        for (
-            root,
-            dirs,
-            files,
-        ) in os.walk(path, topdown=True):
-            # filtering
-            dirs[:] = [d for d in dirs if d not in exclude_dirs]
-            files[:] = [f for f in files if Path(f).suffix not in exclude_files]
-            yield root, dirs, files
-
-    def search(self):
-        debug = False
-        self.items = []
-        # you can add more
-        exclude_dirs = {".git", ".svn", ".hg", ".bzr", ".idea", "__pycache__", "venv"}
-        if self.search_project:
-            exclude_dirs.remove("venv")
-        exclude_files = {".svg", ".png", ".exe", ".pyc", ".qm", ".jpg", ".jpeg", ".gif"}
-
-        for root, _, files in self.walkdir(self.search_path, exclude_dirs, exclude_files):
-            # total search limit
-            if len(self.items) > 5_000:
-                break
-            for file_ in files:
-                full_path = os.path.join(root, file_)
-                if self.is_binary(full_path):
+        def results():
+            exclude_dirs = search_core.exclude_dirs_for(search_project)
+            # 'Search in modules' also looks into what ignore files leave out (a virtual environment usually is)
+            use_ignore_files = not search_project
+            # unsaved editor contents first (they are in memory already), then everything else from disk
+            buffer_paths = []
+            for path, contents in (buffers or {}).items():
+                if search_core.is_searched(
+                    path, search_path, exclude_dirs, search_core.EXCLUDE_FILES, use_ignore_files
+                ):
+                    buffer_paths.append(path)
+                    # the bytes are copied out of the editor's snapshot here, in the search thread
+                    yield search_core.scan_bytes(path, bytes(contents), query)
+                if self.is_stale(generation):
+                    return
+
+            paths = None
+            index = self.index_worker.index_for(search_path)
+            if index is not None:
+                paths = index.candidates(
+                    search_text,
+                    literal=query.literal is not None,
+                    search_project=search_project,
+                    use_ignore_files=use_ignore_files,
+                    check_changes=changed is None,
+                    changed=changed or (),
+                )
+
+            yield from search_core.search(
+                search_path,
+                query,
+                executor,
+                exclude_dirs=exclude_dirs,
+                workers=self.workers,
+                is_cancelled=lambda: self.is_stale(generation),
+                paths=paths,
+                skip_paths=buffer_paths,
+                use_ignore_files=use_ignore_files,
+            )
+
+        if query is not None:
+            for hits in results():
+                batch.extend(hits[: self.MAX_RESULTS - found])
+                found += len(hits)
+                flush()
+                if found >= self.MAX_RESULTS:
                     break
 
-                try:
-                    with open(full_path, "r", encoding="utf8") as f:
-                        try:
-                            reg = re.compile(self.search_text, re.IGNORECASE)
-                            for i, line in enumerate(f):
-                                if m := reg.search(line):
-                                    fd = SearchItem(
-                                        file_,
-                                        full_path,
-                                        i,
-                                        m.end(),
-                                        line[m.start() :].strip()[:50],  # limiting to 50 chars
-                                    )
-                                    self.items.append(fd)
-                        except re.error as e:
-                            if debug:
-                                print(e)
-                except UnicodeDecodeError as e:
-                    if debug:
-                        print(e)
-                    continue
-
-        self.finished.emit(self.items)
+        if self.is_stale(generation):
+            return
+        flush(force=True)
+        self.finished.emit(generation)
 
     def run(self):
-        self.search()
+        while True:
+            with self.pending_condition:
+                while self.pending is None and not self.stopping:
+                    self.pending_condition.wait()
+                if self.stopping:
+                    return
+                request, self.pending = self.pending, None
+            # an exception escaping QThread.run() would end the editor
+            try:
+                self.search(*request)
+            except Exception as e:
+                if isinstance(e, BrokenExecutor):
+                    self.drop_pool()
+                generation = request[0]
+                if not self.is_stale(generation):
+                    self.failed.emit(f"Search failed: {e}")
+                    self.finished.emit(generation)
+
+    def stop(self):
+        """Drop the running search and end the thread (wait() for it afterwards)."""
+        with self.pending_condition:
+            self.stopping = True
+            self.generation += 1
+            self.pending_condition.notify()
+
+    def shutdown(self):
+        """Stop the search and index threads and the process pool, for quitting; blocks until they are done."""
+        self.stop()
+        self.index_worker.stop()
+        self.wait()
+        self.index_worker.wait()
+        with self.executor_lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True, cancel_futures=True)
+                self.executor = None
 
-    def update(self, pattern, path, search_project):
+    def update(self, pattern, path, search_project, all_matches=False):
+        """Schedule a search for pattern; anything still running or pending for an earlier query is dropped."""
         self.search_text = pattern
         self.search_path = path
         self.search_project = search_project
+        self.all_matches = all_matches
+        self.generation += 1
+        self.debounce_timer.start()
+
+    def cancel(self):
+        """Drop the running and pending searches without starting another one."""
+        self.debounce_timer.stop()
+        self.generation += 1
+
+    def unapplied_changes(self) -> Optional[set]:
+        """Changes below a watched search folder the index may not have yet; None if the folder isn't watched."""
+        if not self.is_watched(self.search_path):
+            return None
+        return self.unreported_changes() | self.index_worker.unapplied_paths()
+
+    def start_search(self):
+        # the running search (if any) is stale by now and stops at its next check, then the thread takes this one
+        with self.pending_condition:
+            self.pending = (
+                self.generation,
+                self.search_text,
+                self.search_path,
+                self.search_project,
+                self.all_matches,
+                self.unsaved_buffers(),
+                self.unapplied_changes(),
+            )
+            self.pending_condition.notify()
+        if not self.isRunning():
+            self.start()
+        # pick up files changed since the last search for the next one
+        if not self.is_watched(self.search_path):
+            self.index_worker.refresh(self.search_path)
+
+
+class ReplaceWorker(QThread):
+    """Rewrites files with the replacements accepted in a search's dry run, on the search worker's pool."""
+
+    # (files changed, matches replaced, error messages)
+    finished = pyqtSignal(int, int, list)
+
+    def __init__(self, search_worker: SearchWorker):
+        super(ReplaceWorker, self).__init__(None)
+        self.search_worker = search_worker
+        self.jobs: list[tuple[str, list[replace_core.Span]]] = []
+        self.reg: Optional[re.Pattern] = None
+        self.replacement = ""
+        self.stopping = False
+
+    def replace(self, jobs: list[tuple[str, list[replace_core.Span]]], reg: re.Pattern, replacement: str):
+        """Start replacing; only called while no replacement is running (see MainWindow.replace_all())."""
+        self.jobs = jobs
+        self.reg = reg
+        self.replacement = replacement
         self.start()
+
+    def run(self):
+        files = replaced = 0
+        errors = []
+        # an exception escaping QThread.run() would end the editor
+        try:
+            executor = self.search_worker.pool()
+            for path, count, error in replace_core.replace(
+                self.jobs,
+                self.reg,
+                self.replacement,
+                executor,
+                self.search_worker.workers,
+                is_cancelled=lambda: self.stopping,
+            ):
+                if error is not None:
+                    errors.append(f"{path}: {error}")
+                elif count:
+                    files += 1
+                    replaced += count
+        except Exception as e:
+            if isinstance(e, BrokenExecutor):
+                self.search_worker.drop_pool()
+            errors.insert(0, f"replacing stopped: {e}")
+        if not self.stopping:
+            self.finished.emit(files, replaced, errors)
+
+    def stop(self):
+        """Leave the files not started on yet as they are (wait() for the thread afterwards)."""
+        self.stopping = True
@@ -18,82 +18,81 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-import builtins
-import keyword
-import re
-import types
 from typing import Optional
 
 from PyQt5.Qsci import QsciLexerCustom, QsciScintilla
-from PyQt5.QtGui import QColor, QFont
+from PyQt5.QtCore import QObject, QTimer
+
+from epiccoder.lexer_core import (
+    PPS_ARCHITECTURES,
+    PPS_COMPARISONS,
+    PPS_DIRECTIVES,
+    PPS_KEYWORDS,
+    PPS_MAX_PAREN_DEPTH,
+    PPS_RULE_SECTIONS,
+    PY_BUILTIN_FUNCTIONS,
+    PY_KEYWORDS,
+    PPSStyle,
+    PyStyle,
+    TextStyle,
+    lex_pps_line_cached,
+    lex_python,
+    lex_text,
+)
+from epiccoder.theme import get_theme
 
 
 # from PyQt5.QtGui import *
 
 
+def apply_styles(editor: QsciScintilla, styles: bytearray) -> None:
+    """
+    Push a whole buffer of style bytes (one per document byte, starting at the current styling position)
+    to Scintilla with a single SCI_SETSTYLINGEX call instead of one setStyling() call per token.
+    """
+    if styles:
+        editor.SendScintilla(QsciScintilla.SCI_SETSTYLINGEX, len(styles), bytes(styles))
+
+
+def get_range_bytes(editor: QsciScintilla, start: int, end: int) -> bytes:
+    """
+    Fetch only the document bytes between the positions start and end (as passed to styleText).
+
+    editor.text() copies and decodes the whole buffer on every styling pass, and slicing the result by
+    character index does not line up with Scintilla's byte positions once the text contains non-ASCII
+    characters.  Here the range is read with SCI_GETTEXTRANGE and left for the lexer core to decode once.
+    """
+    if end <= start:
+        return b""
+    # QsciScintilla.bytes() includes the terminating NUL written by SCI_GETTEXTRANGE
+    return bytes(editor.bytes(start, end))[: end - start]
+
+
 class PyCustomLexer(QsciLexerCustom):
     def __init__(self, parent):
         super(PyCustomLexer, self).__init__(parent)
 
-        self.color1 = "#ffffff"  # "#abb2bf"
-        self.color2 = "#282c34"
-
-        # Default Settings
-        self.setDefaultColor(QColor(self.color1))
-        self.setDefaultPaper(QColor(self.color2))
-        self.setDefaultFont(QFont("Consolas", 14))
+        self.lazy_styler: Optional[LazyStyler] = None
 
         # Keywords
-        self.KEYWORD_LIST = keyword.kwlist
+        self.KEYWORD_LIST = PY_KEYWORDS
 
-        self.builtin_functions_names = [
-            name for name, obj in vars(builtins).items() if isinstance(obj, types.BuiltinFunctionType)
-        ]
+        self.builtin_functions_names = PY_BUILTIN_FUNCTIONS
 
         # color per style
-        self.DEFAULT = 0
-        self.KEYWORD = 1
-        self.TYPES = 2
-        self.STRING = 3
-        self.KEYARGS = 4
-        self.BRACKETS = 5
-        self.COMMENTS = 6
-        self.CONSTANTS = 7
-        self.FUNCTIONS = 8
-        self.CLASSES = 9
-        self.FUNCTION_DEF = 10
-
-        # styles
-        self.setColor(QColor(self.color1), self.DEFAULT)
-        self.setColor(QColor("#c678dd"), self.KEYWORD)  # (198 , 120 , 221)
-        self.setColor(QColor("#56b6c2"), self.TYPES)  # (86 , 182 , 194)
-        self.setColor(QColor("#98c379"), self.STRING)  # (152 , 195 , 121)
-        self.setColor(QColor("#c678dd"), self.KEYARGS)  # (198 , 120 , 221)
-        self.setColor(QColor("#c678dd"), self.BRACKETS)  # (198 , 120 , 221)
-        self.setColor(QColor("#777777"), self.COMMENTS)  # (119 , 119 , 119)
-        self.setColor(QColor("#d19a5e"), self.CONSTANTS)  # (209 , 154 , 94)
-        self.setColor(QColor("#61afd1"), self.FUNCTIONS)  # (97 , 175 , 209)
-        self.setColor(QColor("#C68F55"), self.CLASSES)  # (198 , 143 , 85)
-        self.setColor(QColor("#61afd1"), self.FUNCTION_DEF)  # (97 , 175 , 209)
-
-        # paper color
-        self.setPaper(QColor(self.color2), self.DEFAULT)
-        self.setPaper(QColor(self.color2), self.KEYWORD)
-        self.setPaper(QColor(self.color2), self.TYPES)
-        self.setPaper(QColor(self.color2), self.STRING)
-        self.setPaper(QColor(self.color2), self.KEYARGS)
-        self.setPaper(QColor(self.color2), self.BRACKETS)
-        self.setPaper(QColor(self.color2), self.COMMENTS)
-        self.setPaper(QColor(self.color2), self.CONSTANTS)
-        self.setPaper(QColor(self.color2), self.FUNCTIONS)
-        self.setPaper(QColor(self.color2), self.CLASSES)
-        self.setPaper(QColor(self.color2), self.FUNCTION_DEF)
-
-        # font
-        self.setFont(QFont("Consolas", 14, QFont.Bold), self.DEFAULT)
-        self.setFont(QFont("Consolas", 14, QFont.Bold), self.KEYWORD)
-        self.setFont(QFont("Consolas", 14, QFont.Bold), self.CLASSES)
-        self.setFont(QFont("Consolas", 14, QFont.Bold), self.FUNCTION_DEF)
+        self.DEFAULT = PyStyle.DEFAULT
+        self.KEYWORD = PyStyle.KEYWORD
+        self.TYPES = PyStyle.TYPES
+        self.STRING = PyStyle.STRING
+        self.KEYARGS = PyStyle.KEYARGS
+        self.BRACKETS = PyStyle.BRACKETS
+        self.COMMENTS = PyStyle.COMMENTS
+        self.CONSTANTS = PyStyle.CONSTANTS
+        self.FUNCTIONS = PyStyle.FUNCTIONS
+        self.CLASSES = PyStyle.CLASSES
+        self.FUNCTION_DEF = PyStyle.FUNCTION_DEF
+
+        get_theme("py_custom").apply(self)
 
     def language(self) -> str:
         return "PYCustomLexer"
@@ -124,148 +123,26 @@ class PyCustomLexer(QsciLexerCustom):
         else:
             return ""
 
-    @staticmethod
-    def get_tokens(text) -> list[str, int]:
-        # 3. Tokenize the text
-        # ---------------------
-        p = re.compile(r"[*]\/|\/[*]|\s+|\w+|\W")
-
-        # 'token_list' is a list of tuples: (token_name, token_len), ex: '(class, 5)'
-        return [(token, len(bytearray(token, "utf-8"))) for token in p.findall(text)]
-
     def styleText(self, start: int, end: int) -> None:
+        if self.lazy_styler is not None:
+            start = self.lazy_styler.clip(start, end)
         self.startStyling(start)
         editor: QsciScintilla = self.parent()
 
-        text = editor.text()[start:end]
-        token_list = self.get_tokens(text)
-
-        string_flag = False
-
-        if start > 0:
-            previous_style_nr = editor.SendScintilla(editor.SCI_GETSTYLEAT, start - 1)
-            if previous_style_nr == self.STRING:
-                string_flag = False
-
-        def next_tok(skip: int = None):
-            if len(token_list) > 0:
-                if skip is not None and skip != 0:
-                    for _ in range(skip - 1):
-                        if len(token_list) > 0:
-                            token_list.pop(0)
-                return token_list.pop(0)
-            else:
-                return None
-
-        def peek_tok(n=0):
-            try:
-                return token_list[n]
-            except IndexError:
-                return [""]
-
-        def skip_space_peek(skip=None):
-            i = 0
-            tok = " "
-            if skip is not None:
-                i = skip
-            while tok[0].isspace():
-                tok = peek_tok(i)
-                i += 1
-            return tok, i
-
-        while True:
-            curr_token = next_tok()
-            if curr_token is None:
-                break
-            tok: str = curr_token[0]
-            tok_len: int = curr_token[1]
-
-            if string_flag:
-                self.setStyling(tok_len, self.STRING)
-                if tok == '"' or tok == "'":
-                    string_flag = False
-                continue
-
-            if tok == "class":
-                name, ni = skip_space_peek()
-                brac_or_colon, _ = skip_space_peek(ni)
-                if name[0].isidentifier() and brac_or_colon[0] in (":", "("):
-                    self.setStyling(tok_len, self.KEYWORD)
-                    _ = next_tok(ni)
-                    self.setStyling(name[1] + 1, self.CLASSES)
-                    continue
-                else:
-                    self.setStyling(tok_len, self.KEYWORD)
-                    continue
-            elif tok == "def":
-                name, ni = skip_space_peek()
-                if name[0].isidentifier():
-                    self.setStyling(tok_len, self.KEYWORD)
-                    _ = next_tok(ni)
-                    self.setStyling(name[1] + 1, self.FUNCTION_DEF)
-                    continue
-                else:
-                    self.setStyling(tok_len, self.KEYWORD)
-                    continue
-            elif tok in self.KEYWORD_LIST:
-                self.setStyling(tok_len, self.KEYWORD)
-            elif tok.isnumeric() or tok == "self":
-                self.setStyling(tok_len, self.CONSTANTS)
-            elif tok in ["(", ")", "{", "}", "[", "]"]:
-                self.setStyling(tok_len, self.BRACKETS)
-            elif tok == '"' or tok == "'":
-                self.setStyling(tok_len, self.STRING)
-                string_flag = True
-            elif tok in self.builtin_functions_names or tok in [
-                "+",
-                "-",
-                "*",
-                "/",
-                "%",
-                "=",
-                "<",
-                ">",
-            ]:
-                self.setStyling(tok_len, self.TYPES)
-            else:
-                self.setStyling(tok_len, self.DEFAULT)
+        styles, _ = lex_python(get_range_bytes(editor, start, end))
+        apply_styles(editor, styles)
 
 
 class TextCustomLexer(QsciLexerCustom):
     def __init__(self, parent):
         super(TextCustomLexer, self).__init__(parent)
-        light_gray = QColor("#abb2bf")
-        charcoal = QColor("#282c34")
-        self.default_text_color = light_gray
-        self.default_bg_color = charcoal
-
-        # Default Settings
-        self.setDefaultColor(light_gray)
-        self.setDefaultPaper(charcoal)
-        self.setDefaultFont(QFont("Consolas", 14))
-
-        self.DEFAULT = 0
-        self.NUMBER = 1
-
-        # colors
-        bright_green = QColor("#a6e22b")
-        red = QColor("#f9245e")
-        teal = QColor("#c678dd")
-        brown = QColor("#736643")
-        light_brown = QColor("#b39e69")
-        purple = QColor("#ac7db8")
-        yellow = QColor("#e7db74")
-        orange = QColor("#fc9221")
-        hot_pink = QColor("#ff00cc")
-        light_blue = QColor("#6495ed")
-
-        # styles
-        self.setColor(QColor(self.default_text_color), self.DEFAULT)
-        self.setColor(purple, self.NUMBER)
-
-        # paper color
-        self.setPaper(self.default_bg_color, self.DEFAULT)
-        self.setPaper(self.default_bg_color, self.NUMBER)
+
+        self.lazy_styler: Optional[LazyStyler] = None
+
+        self.DEFAULT = TextStyle.DEFAULT
+        self.NUMBER = TextStyle.NUMBER
+
+        get_theme("text").apply(self)
 
     def description(self, style: int) -> str:
         if style == self.DEFAULT:
@@ -275,190 +152,58 @@ class TextCustomLexer(QsciLexerCustom):
         else:
             return ""
 
-    @staticmethod
-    def get_tokens(text) -> list[str, int]:
-        p = re.compile(r"[*]|\/\/+|\s+|\w+|\W|\s")
-
-        return [(token, len(bytearray(token, "utf-8"))) for token in p.findall(text)]
-
     def styleText(self, start: int, end: int) -> None:
+        if self.lazy_styler is not None:
+            start = self.lazy_styler.clip(start, end)
         self.startStyling(start)
         editor: QsciScintilla = self.parent()
 
-        text = editor.text()[start:end]
-        token_list = [(s.lower(), i) if isinstance(s, str) else (s, i) for s, i in self.get_tokens(text)]
-
-        def next_tok(skip: int = None):
-            if len(token_list) > 0:
-                if skip is not None and skip != 0:
-                    for _ in range(skip - 1):
-                        if len(token_list) > 0:
-                            token_list.pop(0)
-                return token_list.pop(0)
-            else:
-                return None
-
-        while True:
-            current_token = next_tok()
-
-            if current_token is None:
-                break
-
-            tok: str = current_token[0]
-            tok_len: int = current_token[1]
-
-            if tok.isnumeric():
-                self.setStyling(tok_len, self.NUMBER)
-            else:
-                self.setStyling(tok_len, self.DEFAULT)
+        styles, _ = lex_text(get_range_bytes(editor, start, end))
+        apply_styles(editor, styles)
 
 
 class PPSCustomLexer(QsciLexerCustom):
     def __init__(self, parent):
         super(PPSCustomLexer, self).__init__(parent)
 
-        light_gray = QColor("#abb2bf")
-        charcoal = QColor("#282c34")
-        self.default_text_color = light_gray
-        self.default_bg_color = charcoal
-
         self.last_tok: Optional[str] = None
 
-        # Default Settings
-        self.setDefaultColor(light_gray)
-        self.setDefaultPaper(charcoal)
-        self.setDefaultFont(QFont("Consolas", 14))
+        # incremental styling: edited range since the last styling pass, and the end of the
+        # contiguous range whose style bytes and line states are known to be valid
+        self.dirty_end: int = 0
+        self.styled_end: int = 0
+
+        self.lazy_styler: Optional[LazyStyler] = None
 
         # Keywords
 
-        self.RULE_SECTIONS = "if", "then"
-        self.COMPARISONS = [
-            "not",
-            "equal",
-            "greater",
-            "least",
-            "different",
-            "less-than",
-            "less_than",
-            "greater-than",
-            "greater_than",
-            "equal-to",
-            "equal_to",
-        ]
-        self.DIRECTIVES = [
-            "if-only-one",
-            "if_only_one",
-            "use-only-one",
-            "use_only_one",
-            "randomly-choose-one",
-            "randomly_choose_one",
-            "unique",
-        ]
-        self.ARCHITECTURES = [
-            "goal",
-            "step",
-            "tag",
-            "visual",
-            "auditory",
-            "tactile",
-            "more",
-            "initial-memory-contents",
-            "initial_memory_contents",
-            "parameters",
-            "named-location",
-            "named_location",
-            "motor",
-            "ocular",
-            "manual",
-            "vocal",
-        ]
-        self.KEYWORDS = [
-            "add",
-            "adddb",
-            "del",
-            "delete",
-            "log",
-            "define",
-            "set-mode",
-            "set_mode",
-            "send-to-motor",
-            "send_to_motor",
-            "delay-countdown",
-            "delay_countdown",
-            "increment",
-            "send-to-temporal",
-            "send_to_temporal",
-        ]
+        self.RULE_SECTIONS = PPS_RULE_SECTIONS
+        self.COMPARISONS = PPS_COMPARISONS
+        self.DIRECTIVES = PPS_DIRECTIVES
+        self.ARCHITECTURES = PPS_ARCHITECTURES
+        self.KEYWORDS = PPS_KEYWORDS
 
         # color per style
-        self.DEFAULT = 0
-
-        self.RULE_SECTION = 1
-        self.COMPARISON = 2
-        self.DIRECTIVE = 3  # rule binding directives
-        self.ARCHITECTURE = 4  # architecture names (wm and other)
-
-        self.COMMENT = 5  # // based comments
-        self.NUMBER = 6
-
-        self.RULE_NAME = 7
-        self.VARIABLE = 8
-
-        self.KEYWORD = 9
-        self.PARENS = 10
-
-        # colors
-        bright_green = QColor("#a6e22b")  # (166 , 226 , 43)
-        red = QColor("#f9245e")  # (249 , 36 , 94)
-        teal = QColor("#c678dd")  # (198 , 120 , 221)
-        brown = QColor("#736643")  # (115 , 102 , 67)
-        light_brown = QColor("#b39e69")  # (179 , 158 , 105)
-        purple = QColor("#ac7db8")  # (172 , 125 , 184)
-        yellow = QColor("#e7db74")  # (231 , 219 , 116)
-        orange = QColor("#fc9221")  # (252 , 146 , 33)
-        hot_pink = QColor("#ff00cc")  # (255 , 0 , 204)
-        light_blue = QColor("#6495ed")  # (100 , 149 , 237)
-
-        # styles
-        self.setColor(QColor(self.default_text_color), self.DEFAULT)
-        self.setColor(QColor(self.default_text_color), self.PARENS)
-        self.setColor(yellow, self.RULE_SECTION)
-        self.setColor(bright_green, self.COMPARISON)
-        self.setColor(red, self.DIRECTIVE)
-        self.setColor(teal, self.ARCHITECTURE)
-        self.setColor(brown, self.COMMENT)
-        self.setColor(purple, self.NUMBER)
-        self.setColor(yellow, self.RULE_NAME)
-        self.setColor(orange, self.VARIABLE)
-        self.setColor(light_blue, self.KEYWORD)
-
-        # paper color
-        self.setPaper(self.default_bg_color, self.DEFAULT)
-        self.setPaper(self.default_bg_color, self.PARENS)
-        self.setPaper(self.default_bg_color, self.RULE_SECTION)
-        self.setPaper(self.default_bg_color, self.COMPARISON)
-        self.setPaper(self.default_bg_color, self.DIRECTIVE)
-        self.setPaper(self.default_bg_color, self.ARCHITECTURE)
-        self.setPaper(self.default_bg_color, self.COMMENT)
-        self.setPaper(self.default_bg_color, self.NUMBER)
-        self.setPaper(self.default_bg_color, self.RULE_NAME)
-        self.setPaper(self.default_bg_color, self.VARIABLE)
-        self.setPaper(self.default_bg_color, self.KEYWORD)
-
-        # font
-        normal_font = QFont("Consolas", 14)
-        bold_font = QFont("Consolas", 14, weight=QFont.Bold)
-        self.setFont(normal_font, self.DEFAULT)
-        self.setFont(normal_font, self.PARENS)
-        self.setFont(bold_font, self.RULE_SECTION)
-        self.setFont(bold_font, self.COMPARISON)
-        self.setFont(bold_font, self.DIRECTIVE)
-        self.setFont(bold_font, self.ARCHITECTURE)
-        self.setFont(normal_font, self.COMMENT)
-        self.setFont(normal_font, self.NUMBER)
-        self.setFont(bold_font, self.RULE_NAME)
-        self.setFont(normal_font, self.VARIABLE)
-        self.setFont(bold_font, self.KEYWORD)
+        self.DEFAULT = PPSStyle.DEFAULT
+
+        self.RULE_SECTION = PPSStyle.RULE_SECTION
+        self.COMPARISON = PPSStyle.COMPARISON
+        self.DIRECTIVE = PPSStyle.DIRECTIVE  # rule binding directives
+        self.ARCHITECTURE = PPSStyle.ARCHITECTURE  # architecture names (wm and other)
+
+        self.COMMENT = PPSStyle.COMMENT  # // based comments
+        self.NUMBER = PPSStyle.NUMBER
+
+        self.RULE_NAME = PPSStyle.RULE_NAME
+        self.VARIABLE = PPSStyle.VARIABLE
+
+        self.KEYWORD = PPSStyle.KEYWORD
+        self.PARENS = PPSStyle.PARENS
+
+        # line state (SCI_SETLINESTATE) layout: see lexer_core.pack_pps_state()
+        self.MAX_PAREN_DEPTH = PPS_MAX_PAREN_DEPTH
+
+        get_theme("prs").apply(self)
 
     def language(self) -> str:
         return "PPS_Rule_Lexer"
@@ -489,102 +234,194 @@ class PPSCustomLexer(QsciLexerCustom):
         else:
             return ""
 
-    @staticmethod
-    def get_tokens(text) -> list[str, int]:
-        # 3. Tokenize the text
-        # ---------------------
+    def setEditor(self, editor: QsciScintilla) -> None:
+        super(PPSCustomLexer, self).setEditor(editor)
+        if editor is not None:
+            editor.SCN_MODIFIED.connect(self.on_modified)
+
+    def on_modified(self, position: int, modification_type: int, text, length: int, lines_added: int, *args) -> None:
+        """
+        Keep track of which part of the document was edited since the last styling pass.
+
+        Single-line edits leave the line states of the lines below intact (they only shift), so styling may
+        stop early once it is past the edit.  Edits that add or remove lines reshuffle the line states, so
+        everything after the edit has to be treated as unstyled.
+        """
+        if modification_type & QsciScintilla.SC_MOD_INSERTTEXT:
+            if position <= self.dirty_end:
+                self.dirty_end += length
+            self.dirty_end = max(self.dirty_end, position + length)
+            if position <= self.styled_end:
+                self.styled_end += length
+        elif modification_type & QsciScintilla.SC_MOD_DELETETEXT:
+            if position < self.dirty_end:
+                self.dirty_end = max(position, self.dirty_end - length)
+            self.dirty_end = max(self.dirty_end, position)
+            if position < self.styled_end:
+                self.styled_end = max(position, self.styled_end - length)
+        else:
+            return
 
-        p = re.compile(r"[*]|\/\/+|\s+|\w+|\W|\s")
+        if lines_added:
+            self.styled_end = min(self.styled_end, position)
 
-        # 'token_list' is a list of tuples: (token_name, token_len), ex: '(class, 5)'
-        return [(token, len(bytearray(token, "utf-8"))) for token in p.findall(text)]
+    def forget_styled_past(self, position: int) -> None:
+        """Stop skipping ahead over styles past position, they may have been styled out of order by LazyStyler."""
+        self.styled_end = min(self.styled_end, position)
 
     def styleText(self, start: int, end: int) -> None:
-        self.startStyling(start)
+        if self.lazy_styler is not None:
+            start = self.lazy_styler.clip(start, end)
         editor: QsciScintilla = self.parent()
 
-        text = editor.text()[start:end]
-        token_list = [(s.lower(), i) if isinstance(s, str) else (s, i) for s, i in self.get_tokens(text)]
-        # from pathlib import Path
-        # Path('freaky_deekey.txt').write_text(str(token_list))
-        string_flag = False
-
-        if start > 0:
-            previous_style_nr = editor.SendScintilla(editor.SCI_GETSTYLEAT, start - 1)
-            if previous_style_nr == self.COMMENT:
-                string_flag = False
-
-        def next_tok(skip: int = None):
-            if len(token_list) > 0:
-                if skip is not None and skip != 0:
-                    for _ in range(skip - 1):
-                        if len(token_list) > 0:
-                            token_list.pop(0)
-                return token_list.pop(0)
-            else:
-                return None
-
-        def peek_tok(n=0):
-            try:
-                return token_list[n]
-            except IndexError:
-                return [""]
-
-        def skip_space_peek(skip=None):
-            i = 0
-            tok = " "
-            if skip is not None:
-                i = skip
-            while tok[0].isspace():
-                tok = peek_tok(i)
-                i += 1
-            return tok, i
-
-        last_token: Optional[str] = None
-        current_token: Optional[str] = None
-
-        while True:
-            if current_token:
-                last_token = current_token
-            current_token = next_tok()
-
-            if current_token is None:
-                break
-
-            tok: str = current_token[0]
-            tok_len: int = current_token[1]
-
-            if string_flag:
-                self.setStyling(tok_len, self.COMMENT)
-                if tok.endswith("\n") or tok.startswith("\n"):
-                    string_flag = False
-                continue
-
-            elif tok in self.RULE_SECTIONS:
-                self.setStyling(tok_len, self.RULE_SECTION)
-            elif tok in self.COMPARISONS:
-                self.setStyling(tok_len, self.COMPARISON)
-            elif tok in self.DIRECTIVES:
-                self.setStyling(tok_len, self.DIRECTIVE)
-            elif tok in self.ARCHITECTURES:
-                self.setStyling(tok_len, self.ARCHITECTURE)
-            elif tok in self.KEYWORDS:
-                self.setStyling(tok_len, self.KEYWORD)
-            elif tok.isnumeric():
-                self.setStyling(tok_len, self.NUMBER)
-            elif tok in ("(", ")"):
-                self.setStyling(tok_len, self.PARENS)
-            elif tok.startswith(";") or tok.startswith("//"):
-                self.setStyling(tok_len, self.COMMENT)
-                string_flag = True
-            else:
-                peek = peek_tok()
-
-                if len(tok) > 2 and last_token and last_token[0] == "(" and peek and peek[0].startswith("\n"):
-                    self.setStyling(tok_len, self.RULE_NAME)
-                elif tok == "?" and last_token and last_token[0] in ("?", " ", "("):
-                    self.setStyling(tok_len, self.VARIABLE)
-                elif "?" not in tok and last_token and last_token[0] == "?":
-                    self.setStyling(tok_len, self.VARIABLE)
-                else:
-                    self.setStyling(tok_len, self.DEFAULT)
+        line = editor.SendScintilla(QsciScintilla.SCI_LINEFROMPOSITION, start)
+        line_count = editor.lines()
+        state = editor.SendScintilla(QsciScintilla.SCI_GETLINESTATE, line - 1) if line > 0 else 0
+
+        self.startStyling(start)
+        styles = bytearray()
+        pos = start
+        while pos < end and line < line_count:
+            old_state = editor.SendScintilla(QsciScintilla.SCI_GETLINESTATE, line)
+            line_end = pos + editor.lineLength(line)
+            line_styles, state = lex_pps_line_cached(get_range_bytes(editor, pos, line_end), state)
+            styles += line_styles
+            editor.SendScintilla(QsciScintilla.SCI_SETLINESTATE, line, state)
+            pos = line_end
+            line += 1
+
+            if state == old_state and self.dirty_end < pos < self.styled_end:
+                # Past the edit and back in sync with the previous pass: the style bytes of the
+                # following lines are still valid, so skip ahead to the end of what was styled before.
+                pos = self.styled_end
+                line = editor.SendScintilla(QsciScintilla.SCI_LINEFROMPOSITION, pos)
+                state = editor.SendScintilla(QsciScintilla.SCI_GETLINESTATE, line - 1) if line > 0 else 0
+                apply_styles(editor, styles)
+                styles.clear()
+                self.startStyling(pos)
+
+        apply_styles(editor, styles)
+        self.styled_end = max(self.styled_end, pos)
+        if pos > self.dirty_end or pos >= editor.length():
+            self.dirty_end = 0
+
+
+class LazyStyler(QObject):
+    """
+    Viewport-first styling for the custom lexers.
+
+    Scintilla styles a document contiguously from the top, so opening a big file and jumping to its end
+    would style everything in between before the first paint.  Instead, a styling request that spans more
+    than a screenful (plus MARGIN_LINES) is clipped to its last screenful, and everything from the
+    'frontier' (the end of the part styled in order) onward is styled in idle-time slices by a zero-interval
+    QTimer.  Scrolling into a part of the document that was skipped styles that viewport right away.
+    """
+
+    MARGIN_LINES = 100  # lines styled beyond the visible ones
+    SLICE_LINES = 1000  # lines styled per idle tick
+
+    def __init__(self, editor: QsciScintilla, lexer: QsciLexerCustom):
+        super(LazyStyler, self).__init__(editor)
+        self.editor = editor
+        self.lexer = lexer
+        lexer.lazy_styler = self
+
+        # everything before the frontier was styled in document order (edits before it are restyled by
+        # Scintilla itself on demand)
+        self.frontier: int = 0
+        self.in_slice = False
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.style_next_slice)
+
+        editor.SCN_MODIFIED.connect(self.on_modified)
+        editor.SCN_UPDATEUI.connect(self.on_update_ui)
+
+    def start(self) -> None:
+        """Style a freshly loaded document from the top while the event loop is idle."""
+        self.frontier = 0
+        self.timer.start()
+
+    def line_start(self, line: int) -> int:
+        if line >= self.editor.lines():
+            return self.editor.length()
+        return self.editor.SendScintilla(QsciScintilla.SCI_POSITIONFROMLINE, line)
+
+    def end_styled(self) -> int:
+        return self.editor.SendScintilla(QsciScintilla.SCI_GETENDSTYLED)
+
+    def viewport_lines(self) -> int:
+        return self.editor.SendScintilla(QsciScintilla.SCI_LINESONSCREEN) + self.MARGIN_LINES
+
+    def clip(self, start: int, end: int) -> int:
+        """Called by the lexer's styleText(), returns the position styling should actually start at."""
+        if self.in_slice:
+            return start
+
+        end_line = self.editor.SendScintilla(QsciScintilla.SCI_LINEFROMPOSITION, end)
+        clipped = self.line_start(max(end_line - self.viewport_lines(), 0))
+        if clipped > start:
+            # leave [start, clipped) to the idle pass
+            self.frontier = min(self.frontier, start)
+            start = clipped
+        elif start <= self.frontier:
+            self.frontier = max(self.frontier, end)
+
+        if self.frontier < self.editor.length():
+            self.timer.start()
+        return start
+
+    def style_range(self, start: int, end: int) -> None:
+        """
+        Style [start, end) out of Scintilla's order.  If the range is not contiguous with what Scintilla
+        considers styled, its end-styled position is put back so that the lines in between are still styled
+        on demand.
+        """
+        watermark = self.end_styled()
+        if isinstance(self.lexer, PPSCustomLexer):
+            self.lexer.forget_styled_past(self.frontier)
+
+        self.in_slice = True
+        try:
+            self.lexer.styleText(start, end)
+        finally:
+            self.in_slice = False
+
+        if start > watermark or self.end_styled() < watermark:
+            self.lexer.startStyling(watermark)
+
+    def style_next_slice(self) -> None:
+        length = self.editor.length()
+        if self.frontier >= length:
+            self.timer.stop()
+            return
+
+        line = self.editor.SendScintilla(QsciScintilla.SCI_LINEFROMPOSITION, self.frontier)
+        start = self.line_start(line)
+        end = self.line_start(line + self.SLICE_LINES)
+        self.style_range(start, end)
+        self.frontier = end
+
+    def on_update_ui(self, updated: int) -> None:
+        if not updated & QsciScintilla.SC_UPDATE_V_SCROLL or self.frontier >= self.editor.length():
+            return
+
+        first_visible = self.editor.SendScintilla(QsciScintilla.SCI_GETFIRSTVISIBLELINE)
+        line = self.editor.SendScintilla(QsciScintilla.SCI_DOCLINEFROMVISIBLE, first_visible)
+        start = self.line_start(line)
+        end = self.line_start(line + self.viewport_lines())
+
+        # Lines Scintilla considers unstyled get styled (and clipped) on paint, only the skipped ones
+        # between the frontier and the end-styled position need styling here
+        if end > self.frontier and start < self.end_styled():
+            self.style_range(start, end)
+        self.timer.start()
+
+    def on_modified(self, position: int, modification_type: int, text, length: int, lines_added: int, *args) -> None:
+        if position >= self.frontier:
+            return
+        if modification_type & QsciScintilla.SC_MOD_INSERTTEXT:
+            self.frontier += length
+        elif modification_type & QsciScintilla.SC_MOD_DELETETEXT:
+            self.frontier = max(position, self.frontier - length)
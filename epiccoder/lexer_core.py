@@ -0,0 +1,404 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Qt-independent tokenizing and classification for the custom lexers in epiccoder.lexer.
+#
+# Every lexer takes UTF-8 document bytes plus a start state and returns one style byte per input byte
+# together with the state at the end of the input, so it can be run (and benchmarked) without a
+# QApplication or a QsciScintilla editor.
+
+import builtins
+import functools
+import keyword
+import re
+import types
+from typing import Optional
+
+# one-byte style runs, indexed by style number
+STYLE_BYTES = [bytes((style,)) for style in range(256)]
+
+
+class PyStyle:
+    DEFAULT = 0
+    KEYWORD = 1
+    TYPES = 2
+    STRING = 3
+    KEYARGS = 4
+    BRACKETS = 5
+    COMMENTS = 6
+    CONSTANTS = 7
+    FUNCTIONS = 8
+    CLASSES = 9
+    FUNCTION_DEF = 10
+
+
+class TextStyle:
+    DEFAULT = 0
+    NUMBER = 1
+
+
+class PPSStyle:
+    DEFAULT = 0
+
+    RULE_SECTION = 1
+    COMPARISON = 2
+    DIRECTIVE = 3  # rule binding directives
+    ARCHITECTURE = 4  # architecture names (wm and other)
+
+    COMMENT = 5  # // based comments
+    NUMBER = 6
+
+    RULE_NAME = 7
+    VARIABLE = 8
+
+    KEYWORD = 9
+    PARENS = 10
+
+
+PY_KEYWORDS = keyword.kwlist
+
+PY_BUILTIN_FUNCTIONS = [name for name, obj in vars(builtins).items() if isinstance(obj, types.BuiltinFunctionType)]
+
+PPS_RULE_SECTIONS = frozenset(["if", "then"])
+PPS_COMPARISONS = frozenset(
+    [
+        "not",
+        "equal",
+        "greater",
+        "least",
+        "different",
+        "less-than",
+        "less_than",
+        "greater-than",
+        "greater_than",
+        "equal-to",
+        "equal_to",
+    ]
+)
+PPS_DIRECTIVES = frozenset(
+    [
+        "if-only-one",
+        "if_only_one",
+        "use-only-one",
+        "use_only_one",
+        "randomly-choose-one",
+        "randomly_choose_one",
+        "unique",
+    ]
+)
+PPS_ARCHITECTURES = frozenset(
+    [
+        "goal",
+        "step",
+        "tag",
+        "visual",
+        "auditory",
+        "tactile",
+        "more",
+        "initial-memory-contents",
+        "initial_memory_contents",
+        "parameters",
+        "named-location",
+        "named_location",
+        "motor",
+        "ocular",
+        "manual",
+        "vocal",
+    ]
+)
+PPS_KEYWORDS = frozenset(
+    [
+        "add",
+        "adddb",
+        "del",
+        "delete",
+        "log",
+        "define",
+        "set-mode",
+        "set_mode",
+        "send-to-motor",
+        "send_to_motor",
+        "delay-countdown",
+        "delay_countdown",
+        "increment",
+        "send-to-temporal",
+        "send_to_temporal",
+    ]
+)
+
+# reserved word -> style, built once so classifying a token is a single dict lookup.  Filled in reverse order
+# of precedence so that a word listed in more than one vocabulary keeps the style of the first one.
+PPS_TOKEN_STYLES: dict[str, int] = {}
+for _words, _style in (
+    (PPS_KEYWORDS, PPSStyle.KEYWORD),
+    (PPS_ARCHITECTURES, PPSStyle.ARCHITECTURE),
+    (PPS_DIRECTIVES, PPSStyle.DIRECTIVE),
+    (PPS_COMPARISONS, PPSStyle.COMPARISON),
+    (PPS_RULE_SECTIONS, PPSStyle.RULE_SECTION),
+):
+    PPS_TOKEN_STYLES.update(dict.fromkeys(_words, _style))
+del _words, _style
+
+# tokenizers, compiled once at import
+PY_TOKEN_RE = re.compile(r"[*]\/|\/[*]|\s+|\w+|\W")
+TEXT_TOKEN_RE = re.compile(r"[*]|\/\/+|\s+|\w+|\W|\s")
+PPS_TOKEN_RE = re.compile(r"[*]|\/\/+|\s+|\w+|\W|\s")
+
+# PPS line state layout: bit 0 = comment open, bit 1 = inside rule header, remaining bits = paren depth
+PPS_MAX_PAREN_DEPTH = 0xFFFF
+
+# distinct (line, entry state) pairs remembered by lex_pps_line_cached()
+PPS_LINE_CACHE_SIZE = 8192
+
+
+def decode(data: bytes) -> str:
+    # surrogateescape keeps invalid bytes one-to-one, so token byte lengths always add up to len(data)
+    return data.decode("utf-8", errors="surrogateescape")
+
+
+def byte_length(token: str) -> int:
+    return len(token.encode("utf-8", errors="surrogateescape"))
+
+
+def get_py_tokens(text: str) -> list[tuple[str, int]]:
+    # 'token_list' is a list of tuples: (token_name, token_len), ex: '(class, 5)'
+    return [(token, byte_length(token)) for token in PY_TOKEN_RE.findall(text)]
+
+
+def get_text_tokens(text: str) -> list[tuple[str, int]]:
+    return [(token, byte_length(token)) for token in TEXT_TOKEN_RE.findall(text)]
+
+
+def get_pps_tokens(text: str) -> list[tuple[str, int]]:
+    # 'token_list' is a list of tuples: (token_name, token_len), ex: '(class, 5)'
+    return [(token, byte_length(token)) for token in PPS_TOKEN_RE.findall(text)]
+
+
+class TokenStream:
+    """
+    Index cursor over a token list with lookahead.
+
+    Consuming a token only advances the cursor, so a styling pass is linear in the number of tokens
+    (popping from the front of the list made it quadratic).
+    """
+
+    __slots__ = ("tokens", "pos")
+
+    def __init__(self, tokens: list[tuple[str, int]]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def next(self, skip: int = None) -> Optional[tuple[str, int]]:
+        """Consume and return the next token, or the skip-th next one if skip is given."""
+        if skip:
+            self.pos += skip - 1
+        if self.pos < len(self.tokens):
+            self.pos += 1
+            return self.tokens[self.pos - 1]
+        return None
+
+    def peek(self, n: int = 0):
+        try:
+            return self.tokens[self.pos + n]
+        except IndexError:
+            return [""]
+
+    def skip_space_peek(self, skip: int = None):
+        """Peek past whitespace tokens, returns the token and the lookahead offset just after it."""
+        i = 0
+        tok = " "
+        if skip is not None:
+            i = skip
+        while tok[0].isspace():
+            tok = self.peek(i)
+            i += 1
+        return tok, i
+
+
+def lex_python(data: bytes, start_state: int = 0) -> tuple[bytearray, int]:
+    """
+    Style a chunk of Python source.  The state is 1 while inside a string literal; the lexer always
+    starts a chunk outside of a string, so start_state is accepted only for a uniform signature.
+    """
+    tokens = TokenStream(get_py_tokens(decode(data)))
+    styles = bytearray()
+
+    string_flag = False
+
+    while True:
+        curr_token = tokens.next()
+        if curr_token is None:
+            break
+        tok: str = curr_token[0]
+        tok_len: int = curr_token[1]
+
+        if string_flag:
+            styles += STYLE_BYTES[PyStyle.STRING] * tok_len
+            if tok == '"' or tok == "'":
+                string_flag = False
+            continue
+
+        if tok == "class":
+            name, ni = tokens.skip_space_peek()
+            brac_or_colon, _ = tokens.skip_space_peek(ni)
+            if name[0].isidentifier() and brac_or_colon[0] in (":", "("):
+                styles += STYLE_BYTES[PyStyle.KEYWORD] * tok_len
+                _ = tokens.next(ni)
+                styles += STYLE_BYTES[PyStyle.CLASSES] * (name[1] + 1)
+                continue
+            else:
+                styles += STYLE_BYTES[PyStyle.KEYWORD] * tok_len
+                continue
+        elif tok == "def":
+            name, ni = tokens.skip_space_peek()
+            if name[0].isidentifier():
+                styles += STYLE_BYTES[PyStyle.KEYWORD] * tok_len
+                _ = tokens.next(ni)
+                styles += STYLE_BYTES[PyStyle.FUNCTION_DEF] * (name[1] + 1)
+                continue
+            else:
+                styles += STYLE_BYTES[PyStyle.KEYWORD] * tok_len
+                continue
+        elif tok in PY_KEYWORDS:
+            styles += STYLE_BYTES[PyStyle.KEYWORD] * tok_len
+        elif tok.isnumeric() or tok == "self":
+            styles += STYLE_BYTES[PyStyle.CONSTANTS] * tok_len
+        elif tok in ["(", ")", "{", "}", "[", "]"]:
+            styles += STYLE_BYTES[PyStyle.BRACKETS] * tok_len
+        elif tok == '"' or tok == "'":
+            styles += STYLE_BYTES[PyStyle.STRING] * tok_len
+            string_flag = True
+        elif tok in PY_BUILTIN_FUNCTIONS or tok in [
+            "+",
+            "-",
+            "*",
+            "/",
+            "%",
+            "=",
+            "<",
+            ">",
+        ]:
+            styles += STYLE_BYTES[PyStyle.TYPES] * tok_len
+        else:
+            styles += STYLE_BYTES[PyStyle.DEFAULT] * tok_len
+
+    return styles, int(string_flag)
+
+
+def lex_text(data: bytes, start_state: int = 0) -> tuple[bytearray, int]:
+    """Style a chunk of plain text (numbers only).  Text styling carries no state between chunks."""
+    styles = bytearray()
+
+    for tok, tok_len in get_text_tokens(decode(data)):
+        if tok.isnumeric():
+            styles += STYLE_BYTES[TextStyle.NUMBER] * tok_len
+        else:
+            styles += STYLE_BYTES[TextStyle.DEFAULT] * tok_len
+
+    return styles, 0
+
+
+def pack_pps_state(comment_open: bool, in_rule_header: bool, paren_depth: int) -> int:
+    return int(comment_open) | (int(in_rule_header) << 1) | (min(paren_depth, PPS_MAX_PAREN_DEPTH) << 2)
+
+
+def unpack_pps_state(state: int) -> tuple[bool, bool, int]:
+    return bool(state & 1), bool(state & 2), state >> 2
+
+
+def lex_pps_line(line: bytes, start_state: int = 0) -> tuple[bytearray, int]:
+    """Style one line of a production rule file (including its EOL), return its styles and end state."""
+    tokens = TokenStream([(s.lower(), i) for s, i in get_pps_tokens(decode(line))])
+    styles = bytearray()
+    string_flag, in_rule_header, paren_depth = unpack_pps_state(start_state)
+
+    last_token: Optional[str] = None
+    current_token: Optional[str] = None
+
+    while True:
+        if current_token:
+            last_token = current_token
+        current_token = tokens.next()
+
+        if current_token is None:
+            break
+
+        tok: str = current_token[0]
+        tok_len: int = current_token[1]
+
+        if string_flag:
+            styles += STYLE_BYTES[PPSStyle.COMMENT] * tok_len
+            if tok.endswith("\n") or tok.startswith("\n"):
+                string_flag = False
+            continue
+
+        style = PPS_TOKEN_STYLES.get(tok)
+        if style is not None:
+            styles += STYLE_BYTES[style] * tok_len
+            if style == PPSStyle.RULE_SECTION:
+                in_rule_header = False
+        elif tok.isnumeric():
+            styles += STYLE_BYTES[PPSStyle.NUMBER] * tok_len
+        elif tok in ("(", ")"):
+            styles += STYLE_BYTES[PPSStyle.PARENS] * tok_len
+            paren_depth = paren_depth + 1 if tok == "(" else max(paren_depth - 1, 0)
+        elif tok.startswith(";") or tok.startswith("//"):
+            styles += STYLE_BYTES[PPSStyle.COMMENT] * tok_len
+            string_flag = True
+        else:
+            peek = tokens.peek()
+
+            if len(tok) > 2 and last_token and last_token[0] == "(" and peek and peek[0].startswith("\n"):
+                styles += STYLE_BYTES[PPSStyle.RULE_NAME] * tok_len
+                in_rule_header = True
+            elif tok == "?" and last_token and last_token[0] in ("?", " ", "("):
+                styles += STYLE_BYTES[PPSStyle.VARIABLE] * tok_len
+            elif "?" not in tok and last_token and last_token[0] == "?":
+                styles += STYLE_BYTES[PPSStyle.VARIABLE] * tok_len
+            else:
+                styles += STYLE_BYTES[PPSStyle.DEFAULT] * tok_len
+
+    return styles, pack_pps_state(string_flag, in_rule_header, paren_depth)
+
+
+@functools.lru_cache(maxsize=PPS_LINE_CACHE_SIZE)
+def lex_pps_line_cached(line: bytes, start_state: int = 0) -> tuple[bytes, int]:
+    """
+    lex_pps_line() behind an LRU cache keyed by the line bytes and entry state.  Production rule files repeat
+    the same clause lines over and over, so most lines are styled without being tokenized again.
+    lex_pps_line_cached.cache_info() reports the hit rate.
+    """
+    styles, state = lex_pps_line(line, start_state)
+    return bytes(styles), state
+
+
+def lex_pps(data: bytes, start_state: int = 0, cached: bool = True) -> tuple[bytearray, int]:
+    """
+    Style a chunk of a production rule file line by line, return its styles and end state.  With cached=False
+    every line is tokenized, bypassing the line style cache (for benchmarks of the tokenizer itself).
+    """
+    lex_line = lex_pps_line_cached if cached else lex_pps_line
+    styles = bytearray()
+    state = start_state
+    # bytes.splitlines() breaks on \r, \n and \r\n, same as Scintilla
+    for line in data.splitlines(keepends=True):
+        line_styles, state = lex_line(line, state)
+        styles += line_styles
+    return styles, state
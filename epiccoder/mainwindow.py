@@ -19,6 +19,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 import os
+import re
 from functools import partial
 from typing import Optional, List
 
@@ -39,19 +40,25 @@ from PyQt5.QtWidgets import (
     QTreeView,
     QLineEdit,
     QCheckBox,
-    QListWidget,
     QSpacerItem,
     QTabWidget,
     QMessageBox,
     QFileDialog,
     QMenu,
     QAction,
+    QPushButton,
 )
 
 from epiccoder.aboutwindow import AboutWin
 from epiccoder.customeditor import CustomEditor
 from epiccoder.duplicatedlg import DuplicateFileNameWin
-from epiccoder.fuzzy_searcher import SearchWorker, SearchItem
+from epiccoder.file_watcher import ProjectWatcher
+from epiccoder.file_info import file_classifier
+from epiccoder.fuzzy_searcher import ReplaceWorker, SearchWorker, SearchResultsModel
+from epiccoder.project_files import project_files
+from epiccoder.quick_open import PathIndexWorker, QuickOpenDialog
+from epiccoder.replace_core import replace_spans
+from epiccoder.search_core import normalized_path
 from epiccoder.questionbox import question_box, critical_box, warning_box
 from epiccoder.resource import get_resource
 
@@ -93,7 +100,19 @@ class MainWindow(QMainWindow):
         self.search_frame: Optional[QFrame] = None
         self.search_checkbox: Optional[QCheckBox] = None
         self.search_worker: Optional[SearchWorker] = None
-        self.search_list_view: Optional[QListWidget] = None
+        self.path_index_worker: Optional[PathIndexWorker] = None
+        self.project_watcher: Optional[ProjectWatcher] = None
+        self.all_matches_checkbox: Optional[QCheckBox] = None
+        self.search_input: Optional[QLineEdit] = None
+        self.replace_checkbox: Optional[QCheckBox] = None
+        self.replace_input: Optional[QLineEdit] = None
+        self.replace_button: Optional[QPushButton] = None
+        self.replace_worker: Optional[ReplaceWorker] = None
+        self.search_results_view: Optional[QTreeView] = None
+        self.search_results: Optional[SearchResultsModel] = None
+        self.search_results_generation: int = 0
+        # (files, matches) replaced in open tabs by the replace in progress
+        self.replaced_in_tabs: tuple[int, int] = (0, 0)
         self.tab_view: Optional[QTabWidget] = None
 
         self.h_split = None
@@ -154,6 +173,12 @@ class MainWindow(QMainWindow):
         if hasattr(open_folder.triggered, "connect"):
             open_folder.triggered.connect(self.open_folder)
 
+        quick_open: QAction = file_menu.addAction("Quick Open")
+        quick_open.setFont(self.window_font)
+        quick_open.setShortcut("Ctrl+P")
+        if hasattr(quick_open.triggered, "connect"):
+            quick_open.triggered.connect(self.quick_open)
+
         file_menu.addSeparator()
 
         # Save/SaveAs File
@@ -268,14 +293,6 @@ class MainWindow(QMainWindow):
         editor = CustomEditor(file_path=file_path, star_func=self.add_star)
         return editor
 
-    @staticmethod
-    def is_binary(path):
-        """
-        Check if file is binary
-        """
-        with open(path, "rb") as f:
-            return b"\0" in f.read(1024)
-
     def add_star(self, file_path: Path):
         for i in range(self.tab_view.count()):
             if str(self.tab_view.tabText(i)).endswith(f"{Path(file_path.parent.name, file_path.name)}"):
@@ -309,7 +326,11 @@ class MainWindow(QMainWindow):
             self.current_file = None
             return
 
-        if self.is_binary(path):
+        info = file_classifier.classify(str(path))
+        if info is None:
+            self.statusBar().showMessage(f"Cannot read {path.name}", 4000)
+            return
+        if info.binary:
             self.statusBar().showMessage("EPICcoder Cannot Open Binary Files!", 4000)
             return
 
@@ -323,7 +344,8 @@ class MainWindow(QMainWindow):
 
         # create new tab
         self.tab_view.addTab(editor, f"{Path(new_file_path.parent.name, new_file_path.name)}")
-        editor.setText(new_file_path.read_text())
+        editor.setText(new_file_path.read_text(encoding=info.encoding))
+        editor.encoding = info.encoding
         self.setWindowTitle(str(new_file_path))
         self.current_file = new_file_path
         self.tab_view.setCurrentIndex(self.tab_view.count() - 1)
@@ -468,7 +490,7 @@ class MainWindow(QMainWindow):
         search_layout.setContentsMargins(0, 10, 0, 0)
         search_layout.setSpacing(0)
 
-        search_input = QLineEdit()
+        search_input = self.search_input = QLineEdit()
         search_input.setPlaceholderText("Search")
         search_input.setFont(self.window_font)
         search_input.setAlignment(Qt.AlignmentFlag.AlignTop)
@@ -493,25 +515,73 @@ class MainWindow(QMainWindow):
         self.search_checkbox.setFont(self.window_font)
         self.search_checkbox.setStyleSheet("color: white; margin-bottom: 10px;")
 
+        self.all_matches_checkbox = QCheckBox("All matches on a line")
+        self.all_matches_checkbox.setFont(self.window_font)
+        self.all_matches_checkbox.setStyleSheet("color: white; margin-bottom: 10px;")
+
         self.search_worker = SearchWorker()
+        self.search_worker.unsaved_buffers = self.unsaved_buffers
+        self.search_worker.found.connect(self.search_found)
         self.search_worker.finished.connect(self.search_finished)
+        self.search_worker.failed.connect(self.show_worker_error)
+        self.search_worker.index_worker.failed.connect(self.show_worker_error)
+
+        self.path_index_worker = PathIndexWorker()
+
+        # files changed in the project folder are re-indexed one by one instead of walking the folder again
+        self.project_watcher = ProjectWatcher()
+        self.project_watcher.changed.connect(self.search_worker.index_worker.update)
+        self.project_watcher.changed.connect(self.path_index_worker.update)
+        self.project_watcher.watching.connect(self.refresh_indexes)
+        self.search_worker.is_watched = self.project_watcher.covers
+        self.search_worker.unreported_changes = self.project_watcher.pending_changes
 
         if hasattr(search_input.textChanged, "connect"):
-            search_input.textChanged.connect(
-                lambda text: self.search_worker.update(
-                    text,
-                    self.model.rootDirectory().absolutePath(),
-                    self.search_checkbox.isChecked(),
-                )
-            )
+            search_input.textChanged.connect(self.update_search)
+            self.all_matches_checkbox.stateChanged.connect(self.update_search)
+
+        ############# REPLACE ################
+        # with 'Replace with' checked the results are a dry run of the replacement, with a check box per match
+        self.replace_checkbox = QCheckBox("Replace with")
+        self.replace_checkbox.setFont(self.window_font)
+        self.replace_checkbox.setStyleSheet("color: white; margin-top: 10px; margin-bottom: 10px;")
+
+        self.replace_input = QLineEdit()
+        self.replace_input.setPlaceholderText("Replace")
+        self.replace_input.setFont(self.window_font)
+        self.replace_input.setStyleSheet(search_input.styleSheet())
+        self.replace_input.setEnabled(False)
+
+        self.replace_button = QPushButton("Replace")
+        self.replace_button.setFont(self.window_font)
+        self.replace_button.setEnabled(False)
+
+        self.replace_worker = ReplaceWorker(self.search_worker)
+        self.replace_worker.finished.connect(self.replace_finished)
+
+        if hasattr(self.replace_checkbox.stateChanged, "connect"):
+            self.replace_checkbox.stateChanged.connect(self.update_replace_preview)
+            self.replace_input.textChanged.connect(self.update_replace_preview)
+            self.replace_button.clicked.connect(self.replace_all)
+
+        replace_layout = QHBoxLayout()
+        replace_layout.setContentsMargins(0, 0, 0, 0)
+        replace_layout.addWidget(self.replace_input)
+        replace_layout.addWidget(self.replace_button)
 
         ##############################
-        ###### SEARCH ListView ##########
-        self.search_list_view = QListWidget()
-        self.search_list_view.setFont(QFont("Fira Code", 13))
-        self.search_list_view.setStyleSheet(
+        ###### SEARCH TreeView ##########
+        # one collapsed row per file with its match count; the matches are listed when the file is expanded
+        self.search_results = SearchResultsModel(self)
+        self.search_results_view = QTreeView()
+        self.search_results_view.setModel(self.search_results)
+        self.search_results_view.setHeaderHidden(True)
+        # every row is one line of text, so the view can lay out any number of rows without measuring them
+        self.search_results_view.setUniformRowHeights(True)
+        self.search_results_view.setFont(QFont("Fira Code", 13))
+        self.search_results_view.setStyleSheet(
             """
-        QListWidget {
+        QTreeView {
             background-color: #21252b;
             border-radius: 5px;
             border: 1px solid #D3D3D3;
@@ -521,13 +591,16 @@ class MainWindow(QMainWindow):
         """
         )
 
-        if hasattr(self.search_list_view.itemClicked, "connect"):
-            self.search_list_view.itemClicked.connect(self.search_list_view_clicked)
+        if hasattr(self.search_results_view.clicked, "connect"):
+            self.search_results_view.clicked.connect(self.search_results_view_clicked)
 
         search_layout.addWidget(self.search_checkbox)
+        search_layout.addWidget(self.all_matches_checkbox)
         search_layout.addWidget(search_input)
+        search_layout.addWidget(self.replace_checkbox)
+        search_layout.addLayout(replace_layout)
         search_layout.addSpacerItem(QSpacerItem(5, 5, QSizePolicy.Minimum, QSizePolicy.Minimum))
-        search_layout.addWidget(self.search_list_view)
+        search_layout.addWidget(self.search_results_view)
 
         self.search_frame.setLayout(search_layout)
 
@@ -562,15 +635,100 @@ class MainWindow(QMainWindow):
 
         self.setCentralWidget(body_frame)
 
-    def search_finished(self, items):
-        self.search_list_view.clear()
-        for i in items:
-            self.search_list_view.addItem(i)
+    def update_search(self):
+        if not self.search_input.text():
+            # an empty pattern matches every line; there is nothing to look for yet
+            self.search_worker.cancel()
+            self.search_results.clear()
+            return
+        self.search_worker.update(
+            self.search_input.text(),
+            self.model.rootDirectory().absolutePath(),
+            self.search_checkbox.isChecked(),
+            self.all_matches_checkbox.isChecked(),
+        )
 
-    def search_list_view_clicked(self, item: SearchItem):
-        self.set_new_tab(Path(item.full_path))
+    def update_replace_preview(self):
+        replacing = self.replace_checkbox.isChecked()
+        self.replace_input.setEnabled(replacing)
+        self.replace_button.setEnabled(replacing)
+        self.search_results.set_replacement(self.replace_input.text() if replacing else None)
+        if self.search_results.replacement_error is not None:
+            self.statusBar().showMessage(f"Invalid replacement: {self.search_results.replacement_error}", 4000)
+
+    def replace_all(self):
+        """Apply the replacements accepted in the dry run: open tabs are edited in place, other files on disk."""
+        results = self.search_results
+        if not results.replacing() or self.replace_worker.isRunning():
+            return
+        reg, replacement = results.replace_reg, results.replacement
+        try:
+            reg.sub(replacement, "")  # checks the template
+        except (re.error, IndexError) as e:
+            self.statusBar().showMessage(f"Invalid replacement: {e}", 4000)
+            return
+
+        editors = {}
+        for i in range(self.tab_view.count()):
+            editor: CustomEditor = self.tab_view.widget(i)
+            editors[normalized_path(str(editor.file_path))] = editor
+
+        jobs = []
+        self.replaced_in_tabs = (0, 0)
+        for path, spans in results.accepted_spans().items():
+            editor = editors.get(normalized_path(path))
+            if editor is None:
+                jobs.append((path, spans))
+                continue
+            text, count = replace_spans(editor.text(), reg, replacement, spans)
+            if count:
+                # one undo step per tab; the tab is marked modified and saved by the user as usual
+                editor.replace_document(text)
+                files, replaced = self.replaced_in_tabs
+                self.replaced_in_tabs = (files + 1, replaced + count)
+
+        self.replace_button.setEnabled(False)
+        self.replace_worker.replace(jobs, reg, replacement)
+
+    def replace_finished(self, files: int, replaced: int, errors: list):
+        tab_files, tab_replaced = self.replaced_in_tabs
+        message = f"Replaced {replaced + tab_replaced} matches in {files + tab_files} files"
+        if errors:
+            message += f" ({len(errors)} files failed: {errors[0]})"
+        self.statusBar().showMessage(message, 8000)
+        self.replace_button.setEnabled(self.replace_checkbox.isChecked())
+        # the results now point at replaced text
+        self.update_search()
+
+    def unsaved_buffers(self) -> dict:
+        """Snapshots of the tabs with unsaved changes, by full path."""
+        buffers = {}
+        for i in range(self.tab_view.count()):
+            if self.tab_view.tabText(i).startswith("*"):
+                editor: CustomEditor = self.tab_view.widget(i)
+                buffers[str(editor.file_path)] = editor.snapshot()
+        return buffers
+
+    def search_found(self, generation: int, hits):
+        if self.search_worker.is_stale(generation):
+            return
+        if generation != self.search_results_generation:
+            # first batch of a new search replaces the results of the previous one
+            self.search_results.clear(self.search_worker.search_text)
+            self.search_results_generation = generation
+        self.search_results.append_hits(hits)
+
+    def search_finished(self, generation: int):
+        self.search_found(generation, [])
+
+    def show_worker_error(self, message: str):
+        self.statusBar().showMessage(message, 8000)
+
+    def search_results_view_clicked(self, index: QModelIndex):
+        _, full_path, lineno, _, end, _ = self.search_results.hit(index)
+        self.set_new_tab(Path(full_path))
         editor: CustomEditor = self.tab_view.currentWidget()
-        editor.setCursorPosition(item.lineno, item.end)
+        editor.setCursorPosition(lineno, end)
         editor.setFocus()
 
     def close_tab(self, index, quiet: bool = False):
@@ -688,7 +846,7 @@ class MainWindow(QMainWindow):
 
         editor: CustomEditor = self.tab_view.currentWidget()
 
-        self.current_file.write_text(editor.text())
+        self.write_editor(editor, self.current_file)
         # self.tab_view.setTabText(self.tab_view.currentIndex(), self.current_file.name)
         self.tab_view.setTabText(
             self.tab_view.currentIndex(),
@@ -696,6 +854,18 @@ class MainWindow(QMainWindow):
         )
         self.statusBar().showMessage(f"Saved {self.current_file.name}", 4000)
 
+    def write_editor(self, editor: CustomEditor, path: Path):
+        """Write the text of editor to path in the encoding the file was read with."""
+        text = editor.text()
+        try:
+            # checked before the file is opened, so a failure can't leave it half written
+            text.encode(editor.encoding)
+        except UnicodeEncodeError:
+            # e.g. a character typed into a latin-1 file that latin-1 doesn't have
+            editor.encoding = "utf-8"
+            self.statusBar().showMessage(f"{path.name} is now saved as UTF-8", 4000)
+        path.write_text(text, encoding=editor.encoding)
+
     def save_as(self):
         # save as
         editor = self.tab_view.currentWidget()
@@ -725,7 +895,7 @@ class MainWindow(QMainWindow):
         path = Path(file_path)
         try:
             if hasattr(editor, "text"):
-                path.write_text(editor.text())
+                self.write_editor(editor, path)
             else:
                 raise AttributeError("The editor {editor} does not have an attribute called `text`")
 
@@ -773,12 +943,42 @@ class MainWindow(QMainWindow):
             self.model.setRootPath(new_folder)
             self.tree_view.setRootIndex(self.model.index(new_folder))
             self.statusBar().showMessage(f"Opened {new_folder}", 4000)
+            self.watch_folder(self.model.rootDirectory().absolutePath())
 
     def set_folder(self, folder: Path):
         if folder.is_dir():
             self.model.setRootPath(str(folder))
             self.tree_view.setRootIndex(self.model.index(str(folder)))
             self.statusBar().showMessage(f"Opened in {str(folder)}", 4000)
+            self.watch_folder(self.model.rootDirectory().absolutePath())
+
+    def watch_folder(self, root: str):
+        if not project_files.is_project_folder(root):
+            # e.g. the home folder: nothing is listed, indexed or watched ahead of a search or quick open in it
+            self.project_watcher.unwatch()
+            self.path_index_worker.clear()
+            return
+        self.refresh_indexes(root)
+        # once watching, the indexes are refreshed once more (refresh_indexes) and then only updated file by file
+        self.project_watcher.watch(root)
+
+    def refresh_indexes(self, root: str):
+        self.search_worker.index_worker.refresh(root)
+        self.path_index_worker.refresh(root)
+
+    def quick_open(self):
+        root = self.model.rootDirectory().absolutePath()
+        # without a watcher reporting changes, pick up files added or removed since the last listing; the dialog
+        # shows the new list when it is ready.  A folder that isn't a project folder is only listed the first
+        # time (again once it is reopened), as walking e.g. the home folder on every Ctrl+P costs too much.
+        listed = self.path_index_worker.index_for(root) is not None
+        if not self.project_watcher.covers(root) and (project_files.is_project_folder(root) or not listed):
+            self.path_index_worker.refresh(root)
+        dialog = QuickOpenDialog(self.path_index_worker, root, self)
+        dialog.setFont(self.window_font)
+        dialog.file_chosen.connect(lambda path: self.set_new_tab(Path(path)))
+        dialog.exec()
+        dialog.deleteLater()
 
     def copy(self):
         editor = self.tab_view.currentWidget()
@@ -806,10 +1006,23 @@ class MainWindow(QMainWindow):
                         font=self.window_font,
                     )
                     if ret == QMessageBox.Yes:
+                        self.stop_workers()
                         event.accept()
                     else:
                         event.ignore()
                     return
 
                     # self.tab_view.setTabText(i, f"*{self.tab_view.tabText(i).strip('*')}")
+        self.stop_workers()
         event.accept()
+
+    def stop_workers(self):
+        """Stop the background threads and the search process pool before the window goes away."""
+        self.project_watcher.unwatch()
+        self.path_index_worker.stop()
+        self.replace_worker.stop()
+        self.project_watcher.wait()
+        self.path_index_worker.wait()
+        self.replace_worker.wait()
+        # last: a replacement still running uses the search worker's pool
+        self.search_worker.shutdown()
@@ -0,0 +1,269 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Enumerates the files of a project folder for search, the search index and quick open.
+#
+# Directories are listed with os.scandir, whose entries already know whether they are directories, and each
+# listing is cached until the directory's mtime changes (adding, removing or renaming an entry changes it), so
+# walking a tree again costs one stat per directory instead of listing it.  Directories changed in the last
+# MTIME_GRANULARITY are listed every time, since another change within the same tick keeps their mtime.
+# Patterns from .gitignore and .ignore files are honored the way git applies them: per directory, deeper files
+# and later lines win, '!' re-includes, and nothing below an ignored directory is looked at.
+
+import os
+import re
+import time
+from typing import Iterable, Iterator, Optional
+
+IGNORE_FILES = (".gitignore", ".ignore")
+
+# entries that make a folder a project: version control, Python packaging, EPIC rule files (by suffix)
+PROJECT_MARKERS = frozenset({".git", ".hg", ".svn", "pyproject.toml", "setup.py", "setup.cfg"})
+PROJECT_SUFFIXES = frozenset({".prs"})
+
+# (directory relative to the walked root, with '/' separators, the pattern is relative to; compiled pattern;
+# negated; matches directories only; matched against the relative path rather than just the name)
+IgnoreRule = tuple[str, re.Pattern, bool, bool, bool]
+
+# a directory's (name, suffix, full path) of each file, (name, full path) of each subdirectory that is not a
+# symbolic link, and all entry names, in listing order
+Listing = tuple[list[tuple[str, str, str]], list[tuple[str, str]], frozenset]
+
+EMPTY_LISTING: Listing = ([], [], frozenset())
+
+# mtime resolution (ns) assumed for directories: 2 s covers FAT, 1 s HFS+ and ext3
+MTIME_GRANULARITY = 2_000_000_000
+
+# directory listings kept; past that the least recently used are dropped, so folders opened earlier in the
+# session (or a walk of something huge) don't stay in memory for good
+MAX_LISTINGS = 50_000
+
+
+def glob_to_regex(pattern: str) -> str:
+    """Regex for a gitignore glob: * and ? stop at '/', **/ is any number of directories, /** everything below."""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i) and (i == 0 or pattern[i - 1] == "/"):
+                if i + 2 == n:
+                    out.append(".*")
+                    i += 2
+                    continue
+                if pattern[i + 2] == "/":
+                    out.append("(?:.*/)?")
+                    i += 3
+                    continue
+            out.append("[^/]*")
+            while i < n and pattern[i] == "*":
+                i += 1
+            continue
+        if c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2 if pattern.startswith("[!", i) or pattern.startswith("[^", i) else i + 1)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : end]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def parse_ignore_file(text: str) -> list[tuple[re.Pattern, bool, bool, bool]]:
+    """The patterns of an ignore file as IgnoreRules without their base directory."""
+    rules = []
+    for line in text.splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        # trailing spaces are dropped unless escaped
+        line = line.rstrip(" ") if not line.endswith("\\ ") else line
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\#") or line.startswith("\\!"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # a pattern with a '/' anywhere but at its end is relative to the ignore file's directory
+        anchored = "/" in line
+        line = line.lstrip("/")
+        try:
+            reg = re.compile(glob_to_regex(line), re.DOTALL)
+        except re.error:
+            continue
+        rules.append((reg, negate, dir_only, anchored))
+    return rules
+
+
+def is_ignored(rules: list[IgnoreRule], rel_path: str, name: str, is_dir: bool) -> bool:
+    """Whether the last of rules matching the entry at rel_path (relative to the walked root) ignores it."""
+    for base, reg, negate, dir_only, anchored in reversed(rules):
+        if dir_only and not is_dir:
+            continue
+        target = (rel_path[len(base) + 1 :] if base else rel_path) if anchored else name
+        if reg.fullmatch(target):
+            return not negate
+    return False
+
+
+class ProjectFiles:
+    """Directory listings and ignore rules cached across walks; one instance is shared by the whole editor."""
+
+    def __init__(self):
+        # directory -> (mtime_ns, listing), least recently used first
+        self.listings: dict[str, tuple[int, Listing]] = {}
+        # ignore file -> ((mtime_ns, size), parsed patterns)
+        self.ignore_patterns: dict[str, tuple[tuple[int, int], list]] = {}
+
+    def listing(self, directory: str) -> Listing:
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return EMPTY_LISTING
+        cached = self.listings.pop(directory, None)
+        if cached is not None and cached[0] == mtime_ns:
+            self.listings[directory] = cached
+            return cached[1]
+
+        files, dirs, names = [], [], []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    names.append(entry.name)
+                    try:
+                        if not entry.is_dir():
+                            files.append((entry.name, os.path.splitext(entry.name)[1], entry.path))
+                        elif not entry.is_symlink():
+                            dirs.append((entry.name, entry.path))
+                    except OSError:
+                        continue
+        except OSError:
+            return EMPTY_LISTING
+        listing = (files, dirs, frozenset(names))
+        # stamped with the mtime from before the listing, so a change made while listing is picked up next time.
+        # A directory changed within one mtime tick of now can change again without its mtime moving, so its
+        # listing is not cached until that tick has passed (git's "racy" entries).
+        if time.time_ns() - mtime_ns >= MTIME_GRANULARITY:
+            self.listings[directory] = (mtime_ns, listing)
+            if len(self.listings) > MAX_LISTINGS:
+                del self.listings[next(iter(self.listings))]
+        return listing
+
+    def forget(self, directory: str) -> None:
+        """Drop the cached listing of directory, e.g. when it is known to have changed within one mtime tick."""
+        self.listings.pop(directory, None)
+
+    def is_project_folder(self, directory: str) -> bool:
+        """
+        Whether directory looks like a project (it has a PROJECT_MARKERS entry or a rule file) rather than e.g.
+        the home folder or a drive, which are not indexed or watched in the background.
+        """
+        directory = os.path.abspath(directory)
+        if directory == os.path.dirname(directory) or directory == os.path.abspath(os.path.expanduser("~")):
+            return False
+        files, _, names = self.listing(directory)
+        return not PROJECT_MARKERS.isdisjoint(names) or any(suffix in PROJECT_SUFFIXES for _, suffix, _ in files)
+
+    def ignore_rules(self, directory: str, base: str, names: Optional[frozenset] = None) -> list[IgnoreRule]:
+        """Rules of the ignore files in directory (names: the directory's entries, if already listed)."""
+        rules = []
+        for name in IGNORE_FILES:
+            if names is not None and name not in names:
+                continue
+            path = os.path.join(directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            key = (st.st_mtime_ns, st.st_size)
+            cached = self.ignore_patterns.get(path)
+            if cached is None or cached[0] != key:
+                try:
+                    with open(path, "r", encoding="utf8", errors="replace") as f:
+                        patterns = parse_ignore_file(f.read())
+                except OSError:
+                    continue
+                cached = self.ignore_patterns[path] = (key, patterns)
+            rules.extend((base, *pattern) for pattern in cached[1])
+        return rules
+
+    def walk(
+        self,
+        root: str,
+        exclude_dirs: Iterable[str] = (),
+        exclude_files: Iterable[str] = (),
+        use_ignore_files: bool = True,
+    ) -> Iterator[str]:
+        """
+        Full paths of the files below root in os.walk (top-down) order, skipping excluded directory names and
+        file suffixes, the files ignored by .gitignore/.ignore files if use_ignore_files, and the contents of
+        symbolically linked directories.
+        """
+        exclude_dirs = set(exclude_dirs)
+        exclude_files = set(exclude_files)
+        stack: list[tuple[str, str, list[IgnoreRule]]] = [(root, "", [])]
+        while stack:
+            directory, rel_dir, rules = stack.pop()
+            files, dirs, names = self.listing(directory)
+            if use_ignore_files:
+                rules = rules + self.ignore_rules(directory, rel_dir, names)
+
+            prefix = f"{rel_dir}/" if rel_dir else ""
+            for name, suffix, path in files:
+                if suffix not in exclude_files and not (rules and is_ignored(rules, prefix + name, name, False)):
+                    yield path
+            stack.extend(
+                (path, prefix + name, rules)
+                for name, path in reversed(dirs)
+                if name not in exclude_dirs and not (rules and is_ignored(rules, prefix + name, name, True))
+            )
+
+    def is_ignored(self, root: str, path: str) -> bool:
+        """Whether path (below root) is left out of walk(root) by an ignore file."""
+        parts = os.path.relpath(path, root).split(os.sep)
+        if parts[0] == os.pardir:
+            return False
+        directory = root
+        rules = self.ignore_rules(root, "", self.listing(root)[2])
+        for i, name in enumerate(parts):
+            rel_path = "/".join(parts[: i + 1])
+            is_dir = i < len(parts) - 1
+            if rules and is_ignored(rules, rel_path, name, is_dir):
+                return True
+            if is_dir:
+                directory = os.path.join(directory, name)
+                rules = rules + self.ignore_rules(directory, rel_path, self.listing(directory)[2])
+        return False
+
+
+project_files = ProjectFiles()
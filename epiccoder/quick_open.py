@@ -0,0 +1,190 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import threading
+from itertools import islice
+from typing import Optional
+
+from PyQt5.QtCore import QEvent, QThread, Qt, pyqtSignal
+from PyQt5.QtWidgets import QDialog, QLineEdit, QListWidget, QListWidgetItem, QVBoxLayout
+
+from epiccoder.project_files import IGNORE_FILES, project_files
+from epiccoder.quick_open_core import PathIndex
+from epiccoder.search_core import EXCLUDE_DIRS, EXCLUDE_FILES, is_searched
+
+# Files listed below a folder that isn't a project folder (see ProjectFiles.is_project_folder()), e.g. the home
+# folder, which could otherwise take minutes to walk; quick open offers the first MAX_PATHS found
+MAX_PATHS = 50_000
+
+
+class PathIndexWorker(QThread):
+    """Lists the files of the current project folder in the background for quick open."""
+
+    # the index was (re)built
+    ready = pyqtSignal()
+
+    def __init__(self):
+        super(PathIndexWorker, self).__init__(None)
+        self.index: Optional[PathIndex] = None
+        self.pending_root: Optional[str] = None
+        # files reported added, changed or removed (see update()), taken by the thread under the lock
+        self.pending_paths: set[str] = set()
+        self.pending_lock = threading.Lock()
+        self.stopping = False
+        # work queued while the thread was on its way out
+        self.finished.connect(self.start_pending)
+
+    def index_for(self, root: str) -> Optional[PathIndex]:
+        """The index of root, None if it has not been built yet."""
+        index = self.index
+        return index if index is not None and index.root == root else None
+
+    def clear(self):
+        """Drop the index, so the next refresh() lists the folder again."""
+        self.index = None
+
+    def refresh(self, root: str):
+        """List the files below root again (unchanged directories come from the listing cache)."""
+        self.pending_root = root
+        if not self.isRunning():
+            self.start()
+
+    def update(self, paths: list):
+        """Add or drop just these files (reported added, changed or removed) instead of listing the folder."""
+        with self.pending_lock:
+            self.pending_paths.update(paths)
+        if not self.isRunning():
+            self.start()
+
+    def start_pending(self):
+        if not self.stopping and (self.pending_root is not None or self.pending_paths):
+            self.start()
+
+    def stop(self):
+        """Drop queued work and stop a listing at its next file (wait() for the thread afterwards)."""
+        self.stopping = True
+
+    def run(self):
+        while not self.stopping:
+            with self.pending_lock:
+                paths, self.pending_paths = self.pending_paths, set()
+            index = self.index
+            # a changed ignore file can hide or reveal any number of files
+            if index is not None and any(os.path.basename(path) in IGNORE_FILES for path in paths):
+                self.pending_root = self.pending_root or index.root
+            if self.pending_root is not None:
+                root, self.pending_root = self.pending_root, None
+                found = []
+                limit = None if project_files.is_project_folder(root) else MAX_PATHS
+                for path in islice(project_files.walk(root, EXCLUDE_DIRS, EXCLUDE_FILES), limit):
+                    if self.stopping or self.pending_root not in (None, root):
+                        break
+                    found.append(path)
+                else:
+                    self.index = PathIndex(root, found)
+                    self.ready.emit()
+            elif paths:
+                if index is None:
+                    continue
+                added, removed = [], []
+                for path in paths:
+                    if os.path.isfile(path) and is_searched(path, index.root, EXCLUDE_DIRS, EXCLUDE_FILES):
+                        added.append(path)
+                    else:
+                        removed.append(path)
+                new_index = index.with_changes(added, removed)
+                if new_index is not index:
+                    self.index = new_index
+                    self.ready.emit()
+            else:
+                break
+
+
+class QuickOpenDialog(QDialog):
+    """
+    Fuzzy file finder: type part of a path, pick a file with Up/Down and open it with Enter (or a double click).
+    The list is updated on every keystroke from the PathIndexWorker's index.
+    """
+
+    # files listed at a time
+    MAX_ITEMS = 50
+
+    # full path of the file picked
+    file_chosen = pyqtSignal(str)
+
+    def __init__(self, worker: PathIndexWorker, root: str, parent=None):
+        super(QuickOpenDialog, self).__init__(parent)
+        self.worker = worker
+        self.root = root
+
+        self.setWindowTitle("Quick Open")
+        self.resize(700, 450)
+
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("File name or part of its path")
+        self.query_input.textChanged.connect(self.update_matches)
+        self.query_input.installEventFilter(self)
+
+        self.match_list = QListWidget()
+        self.match_list.setUniformItemSizes(True)
+        self.match_list.itemActivated.connect(self.choose)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.query_input)
+        layout.addWidget(self.match_list)
+
+        # the index may still be being built (or refreshed); show it as soon as it is there
+        self.worker.ready.connect(self.update_matches)
+        self.update_matches()
+
+    def update_matches(self):
+        self.match_list.clear()
+        index = self.worker.index_for(self.root)
+        if index is None:
+            self.match_list.addItem("Listing files...")
+            return
+        for _, path in index.find(self.query_input.text(), self.MAX_ITEMS):
+            item = QListWidgetItem(os.path.relpath(path, self.root))
+            item.setData(Qt.UserRole, path)
+            self.match_list.addItem(item)
+        self.match_list.setCurrentRow(0)
+
+    def eventFilter(self, obj, event) -> bool:
+        # Up/Down/Enter typed in the query box move through and pick from the list
+        if obj is self.query_input and event.type() == QEvent.KeyPress:
+            key = event.key()
+            if key in (Qt.Key_Up, Qt.Key_Down, Qt.Key_PageUp, Qt.Key_PageDown):
+                self.match_list.keyPressEvent(event)
+                return True
+            if key in (Qt.Key_Return, Qt.Key_Enter):
+                self.choose(self.match_list.currentItem())
+                return True
+        return super(QuickOpenDialog, self).eventFilter(obj, event)
+
+    def choose(self, item: Optional[QListWidgetItem]):
+        path = item.data(Qt.UserRole) if item is not None else None
+        if path:
+            self.file_chosen.emit(path)
+            self.accept()
+
+    def done(self, result: int):
+        self.worker.ready.disconnect(self.update_matches)
+        super(QuickOpenDialog, self).done(result)
@@ -0,0 +1,207 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Qt-independent fuzzy file finder used by the quick open palette (epiccoder.quick_open).
+#
+# A path matches a query if the query's characters occur in it in order (case-insensitively).  Matching is
+# done without a Python loop per path: a query compiles to an anchored regex without backtracking
+# ('[^a]*a[^b]*b...') that is mapped over the candidates with map()/compress().  The candidates are the
+# paths containing the query's rarest character (one list per character, built when first needed), or the
+# matches of the previous query when the new one extends it, so each keystroke narrows the last result.
+#
+# Matches are ranked fzf-style: points per matched character, bonuses for matches at the start of a path
+# component or word, in a row, or in the file name, and penalties for gaps.  Only SCORE_LIMIT matches are
+# scored, which bounds the work for one- or two-letter queries: first those whose file name has a word
+# starting with the query, then those whose file name contains it, then those whose file name matches it,
+# then the rest, each shortest path first.  The boundary and file name bonuses make a match from an earlier
+# group outscore one from a later group in all but contrived cases.
+
+import heapq
+import operator
+import os
+import re
+from itertools import chain, compress, islice, repeat
+from typing import Iterable, Iterator, Optional
+
+SCORE_MATCH = 16
+BONUS_BOUNDARY = 8
+BONUS_CONSECUTIVE = 4
+BONUS_FILE_NAME = 8
+PENALTY_GAP_START = 3
+PENALTY_GAP = 1
+
+SEPARATORS = frozenset("/\\_-. ")
+
+# matches scored per query, in shortest-path-first order
+SCORE_LIMIT = 1000
+
+
+def subsequence_regex(query: str) -> re.Pattern:
+    """Regex that re.match()es the strings containing the characters of query in order."""
+    return re.compile("".join(f"[^{re.escape(c)}]*{re.escape(c)}" for c in query), re.DOTALL)
+
+
+def match_positions(key: str, query: str, start: int = 0) -> Optional[list[int]]:
+    """
+    Positions in key of a shortest-ending match of query from start on, None if there is none.  The first match
+    found left to right is tightened from its end backwards, as fzf does, so it spans as few characters as
+    possible.
+    """
+    pos = start - 1
+    for c in query:
+        pos = key.find(c, pos + 1)
+        if pos < 0:
+            return None
+    positions = [pos]
+    for c in reversed(query[:-1]):
+        pos = key.rfind(c, start, pos)
+        positions.append(pos)
+    positions.reverse()
+    return positions
+
+
+def score(path: str, key: str, query: str) -> int:
+    """Score of a matching path (key is path lower-cased) for query; higher is better."""
+    if len(path) != len(key):
+        # lower() changed the length (a few non-ASCII characters do), so the case of path can't be consulted
+        path = key
+    name_start = key.rfind("/") + 1
+    # a match inside the file name beats one spread over the directories
+    positions = match_positions(key, query, name_start) or match_positions(key, query)
+    total = 0
+    previous = -1
+    for pos in positions:
+        total += SCORE_MATCH
+        if pos == 0 or key[pos - 1] in SEPARATORS or (path[pos].isupper() and path[pos - 1].islower()):
+            total += BONUS_BOUNDARY
+        if pos >= name_start:
+            total += BONUS_FILE_NAME
+        if previous >= 0:
+            if pos == previous + 1:
+                total += BONUS_CONSECUTIVE
+            else:
+                total -= PENALTY_GAP_START + PENALTY_GAP * (pos - previous - 2)
+        previous = pos
+    return total
+
+
+class PathIndex:
+    """The paths of a project's files relative to its root, with '/' separators, for fuzzy matching."""
+
+    def __init__(self, root: str, paths: Iterable[str] = ()):
+        self.root = root
+        self.paths: list[str] = []
+        self.keys: list[str] = []
+        self.names: list[str] = []  # file name part of each key
+        self.by_char: dict[str, list[int]] = {}
+        self.last_query = ""
+        self.last_matches: Optional[list[int]] = None
+        self.set_paths(paths)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def relative_path(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def set_paths(self, paths: Iterable[str]) -> None:
+        """Replace the indexed paths (full paths below root)."""
+        self.set_relative_paths(map(self.relative_path, paths))
+
+    def set_relative_paths(self, rel_paths: Iterable[str]) -> None:
+        self.paths = sorted(rel_paths, key=lambda p: (len(p), p))
+        self.keys = [path.lower() for path in self.paths]
+        self.names = [key[key.rfind("/") + 1 :] for key in self.keys]
+        self.by_char = {}
+        self.last_query = ""
+        self.last_matches = None
+
+    def with_changes(self, added: Iterable[str], removed: Iterable[str]) -> "PathIndex":
+        """
+        This index with some paths (full paths below root) added and removed: a new index, so one in use on
+        another thread is not changed under it, or this one if that changes nothing.
+        """
+        paths = set(self.paths)
+        count = len(paths)
+        paths.difference_update(map(self.relative_path, removed))
+        removed_count = count - len(paths)
+        paths.update(map(self.relative_path, added))
+        if not removed_count and len(paths) == count:
+            return self
+        index = PathIndex(self.root)
+        index.set_relative_paths(paths)
+        return index
+
+    def with_char(self, c: str) -> list[int]:
+        """Indexes of the paths containing c, in path order."""
+        ids = self.by_char.get(c)
+        if ids is None:
+            ids = self.by_char[c] = list(compress(range(len(self.keys)), map(operator.contains, self.keys, repeat(c))))
+        return ids
+
+    def matches(self, query: str) -> list[int]:
+        """Indexes of the paths query matches, in path order."""
+        if self.last_matches is not None and self.last_query and query.startswith(self.last_query):
+            candidates = self.last_matches
+        else:
+            candidates = min((self.with_char(c) for c in set(query)), key=len)
+        reg = subsequence_regex(query)
+        matches = list(compress(candidates, map(reg.match, map(self.keys.__getitem__, candidates))))
+        self.last_query = query
+        self.last_matches = matches
+        return matches
+
+    def file_name_matches_first(self, query: str, matches: list[int], limit: int) -> list[int]:
+        """
+        The first limit of matches when ordered: a word of the file name starts with query, the file name
+        contains query, the file name matches query, the rest (each group in path order).  The groups are
+        taken lazily, so a later one is only looked at while the earlier ones fall short of limit.
+        """
+        names = list(map(self.names.__getitem__, matches))
+        in_name = list(map(operator.contains, names, repeat(query)))
+        word_start = re.compile(f"(?:^|[{re.escape(''.join(sorted(SEPARATORS)))}]){re.escape(query)}").search
+        name_match = subsequence_regex(query).match
+
+        def group(contains_query: bool, test, passes: bool) -> Iterator[int]:
+            selected = in_name if contains_query else list(map(operator.not_, in_name))
+            results = map(test, compress(names, selected))
+            return compress(compress(matches, selected), results if passes else map(operator.not_, results))
+
+        groups = chain(
+            group(True, word_start, True),
+            group(True, word_start, False),
+            group(False, name_match, True),
+            group(False, name_match, False),
+        )
+        return list(islice(groups, limit))
+
+    def find(self, query: str, limit: int = 50) -> list[tuple[int, str]]:
+        """The best (score, full path) matches for query, best first; every path (up to limit) for no query."""
+        query = query.replace("\\", "/").replace(" ", "").lower()
+        if not query:
+            return [(0, os.path.join(self.root, path)) for path in self.paths[:limit]]
+
+        matches = self.matches(query)
+        if len(matches) > SCORE_LIMIT:
+            matches = self.file_name_matches_first(query, matches, SCORE_LIMIT)
+        paths, keys = self.paths, self.keys
+        # ties go to the shorter path, which comes first
+        best = heapq.nlargest(limit, ((score(paths[i], keys[i], query), -n, i) for n, i in enumerate(matches)))
+        return [(points, os.path.join(self.root, paths[i])) for points, _, i in best]
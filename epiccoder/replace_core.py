@@ -0,0 +1,150 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Qt-independent find-and-replace over the hits of a project search (see epiccoder.search_core).
+#
+# Only the hits the user accepted are replaced: each is given as (line number, start column, end column) like
+# in a search_core.Hit, and the pattern is matched again at that spot, so a file that changed since the search
+# keeps whatever no longer matches.  Files are rewritten on a process pool, each through a temporary file in
+# the same directory that is renamed over the original.
+
+import contextlib
+import os
+import re
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable, Iterable, Iterator, Optional
+
+from epiccoder.search_core import QUEUE_DEPTH, chunked, wait_for
+
+# (line number, start column, end column) of a hit to replace
+Span = tuple[int, int, int]
+
+# (full path, matches replaced, error message or None)
+ReplaceResult = tuple[str, int, Optional[str]]
+
+# lines end at \n, \r or \r\n, like in the text mode reads the search does
+LINE_BREAK_RE = re.compile(r"(\r\n|\r|\n)")
+
+# files per task handed to a worker
+CHUNK_SIZE = 16
+
+
+def replace_spans(text: str, reg: re.Pattern, replacement: str, spans: Iterable[Span]) -> tuple[str, int]:
+    """
+    text with the matches of reg at spans replaced by the template replacement (as in re.sub), and the number
+    of matches replaced.  Line breaks are kept as they are.
+    """
+    wanted: dict[int, set[tuple[int, int]]] = {}
+    for lineno, start, end in spans:
+        wanted.setdefault(lineno, set()).add((start, end))
+
+    parts = LINE_BREAK_RE.split(text)  # lines at even indexes, the line breaks between them at odd ones
+    count = 0
+    for lineno, line_spans in wanted.items():
+        i = 2 * lineno
+        if i >= len(parts):
+            continue
+        line = parts[i]
+        # the search matched the line with its line break translated to \n, so the same is done here; a match
+        # running into the line break is not replaced
+        subject = line + "\n" if i + 1 < len(parts) else line
+        pieces = []
+        pos = 0
+        for m in reg.finditer(subject):
+            if (m.start(), m.end()) in line_spans and m.end() <= len(line):
+                pieces.append(line[pos : m.start()])
+                pieces.append(m.expand(replacement))
+                pos = m.end()
+                count += 1
+        if pieces:
+            parts[i] = "".join(pieces) + line[pos:]
+    return "".join(parts), count
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """
+    Replace the contents of path by writing a temporary file next to it and renaming it over path.  A symbolic
+    link is followed, so the file it points to is replaced and the link kept.
+    """
+    path = os.path.realpath(path)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or None, prefix=".epiccoder-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+def replace_in_file(path: str, reg: re.Pattern, replacement: str, spans: list[Span]) -> ReplaceResult:
+    try:
+        with open(path, "rb") as f:
+            text = f.read().decode("utf8")
+        new_text, count = replace_spans(text, reg, replacement, spans)
+        if count:
+            write_atomic(path, new_text.encode("utf8"))
+    except (OSError, UnicodeDecodeError, re.error, IndexError) as e:
+        return path, 0, str(e)
+    return path, count, None
+
+
+def replace_in_files(jobs: list[tuple[str, list[Span]]], reg: re.Pattern, replacement: str) -> list[ReplaceResult]:
+    """Worker task: replace in a chunk of files."""
+    return [replace_in_file(path, reg, replacement, spans) for path, spans in jobs]
+
+
+def replace(
+    jobs: Iterable[tuple[str, list[Span]]],
+    reg: re.Pattern,
+    replacement: str,
+    executor: Executor,
+    workers: Optional[int] = None,
+    is_cancelled: Callable[[], bool] = lambda: False,
+) -> Iterator[ReplaceResult]:
+    """
+    Replace the spans of each (path, spans) job on executor, yield the result for each file in job order.
+
+    Stops as soon as is_cancelled() returns True: queued chunks are cancelled, files already being rewritten
+    are finished (each is replaced atomically) but their results are not reported.
+    """
+    max_in_flight = (workers or os.cpu_count() or 1) * QUEUE_DEPTH
+    in_flight = deque()
+    try:
+        for chunk in chunked(jobs, CHUNK_SIZE):
+            if is_cancelled():
+                return
+            in_flight.append(executor.submit(replace_in_files, chunk, reg, replacement))
+            while len(in_flight) >= max_in_flight:
+                if not wait_for(in_flight[0], is_cancelled):
+                    return
+                yield from in_flight.popleft().result()
+        while in_flight:
+            if not wait_for(in_flight[0], is_cancelled):
+                return
+            yield from in_flight.popleft().result()
+    finally:
+        for future in in_flight:
+            future.cancel()
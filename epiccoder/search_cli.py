@@ -0,0 +1,111 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# epiccoder-search: the editor's project search (epiccoder.search_core) from the command line, without Qt.
+#
+# Hits are printed as they come in, in the order the editor lists them, as 'path:line:column: preview' or,
+# with --json, one JSON object per line: {"path", "line", "start", "end", "preview"} with 1-based line numbers
+# and 0-based columns (the plain format counts columns from 1).  The exit status is 0 if something was found,
+# 1 if not and 2 on an error, like grep's.
+#
+#   > epiccoder-search 'Send_To_(Motor|Vocal)' ~/epic/rules --include '*.prs' --json --workers 4
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+from epiccoder import search_core
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="epiccoder-search", description="Search a folder like EPICcoder does.")
+    parser.add_argument("pattern", help="regular expression (Python syntax) or, with --literal, plain text")
+    parser.add_argument("path", nargs="?", default=".", help="folder to search (default: the current one)")
+    parser.add_argument("-F", "--literal", action="store_true", help="search for the pattern as plain text")
+    parser.add_argument("-s", "--case-sensitive", action="store_true", help="match case (default: ignore it)")
+    parser.add_argument("-a", "--all-matches", action="store_true", help="report every match on a line")
+    parser.add_argument(
+        "-i", "--include", action="append", default=[], metavar="GLOB", help="only search files matching GLOB"
+    )
+    parser.add_argument("-e", "--exclude", action="append", default=[], metavar="GLOB", help="skip files matching GLOB")
+    parser.add_argument("--no-ignore", action="store_true", help="also search files .gitignore/.ignore leave out")
+    parser.add_argument("-j", "--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--json", action="store_true", help="print hits as JSON lines")
+    parser.add_argument("--stats", action="store_true", help="print the hit count and time taken to stderr")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.path):
+        parser.error(f"not a folder: {args.path}")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    try:
+        query = search_core.SearchQuery(
+            args.pattern,
+            flags=0 if args.case_sensitive else re.IGNORECASE,
+            all_matches=args.all_matches,
+            literal=args.literal,
+        )
+    except re.error as e:
+        print(f"epiccoder-search: invalid pattern: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    found = 0
+    t0 = time.perf_counter()
+    try:
+        for hits in search_core.search_tree(
+            args.path,
+            query,
+            include=args.include,
+            exclude=args.exclude,
+            workers=args.workers,
+            use_ignore_files=not args.no_ignore,
+        ):
+            if not hits:
+                continue
+            if args.json:
+                lines = (
+                    json.dumps(
+                        {"path": path, "line": lineno + 1, "start": start, "end": end, "preview": preview},
+                        ensure_ascii=False,
+                    )
+                    for _, path, lineno, start, end, preview in hits
+                )
+            else:
+                lines = (f"{path}:{lineno + 1}:{start + 1}: {preview}" for _, path, lineno, start, _, preview in hits)
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+            found += len(hits)
+    except BrokenPipeError:
+        # the reader (e.g. head) has gone away; keep Python from complaining about stdout at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+    if args.stats:
+        print(f"{found} hits in {time.perf_counter() - t0:.3f} s", file=sys.stderr)
+    sys.exit(0 if found else 1)
+
+
+if __name__ == "__main__":
+    main()
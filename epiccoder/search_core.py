@@ -0,0 +1,636 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Qt-independent project search used by epiccoder.fuzzy_searcher.SearchWorker and the epiccoder-search
+# command (epiccoder.search_cli).
+#
+# Files are enumerated in os.walk order and scanned in chunks on a process (or thread) pool.  Only a bounded
+# number of chunks is in flight at a time, and results are handed back in the order the chunks were
+# submitted, so the output is the same as a sequential scan no matter how many workers run.
+
+import fnmatch
+import functools
+import io
+import mmap
+import multiprocessing
+import os
+import re
+from array import array
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from epiccoder.file_info import file_classifier
+from epiccoder.project_files import project_files
+
+# (file name, full path, line number, start and end column of the match, preview of the line from the match on)
+Hit = tuple[str, str, int, int, int, str]
+
+REGEX_METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
+NON_ASCII_RE = re.compile(rb"[\x80-\xff]")
+
+# characters taken by the argument of an escape, e.g. the 41 of \x41
+ESCAPE_ARGUMENT_LENGTHS = {"x": 2, "u": 4, "U": 8}
+
+# shortest required literal worth prefiltering a regex search with
+PREFILTER_MIN_LENGTH = 3
+
+# files at least this big are memory-mapped instead of read, so scanning them allocates next to nothing
+MMAP_MIN_SIZE = 4 * 1024 * 1024
+LINE_COUNT_CHUNK = 1024 * 1024
+
+EXCLUDE_DIRS = frozenset({".git", ".svn", ".hg", ".bzr", ".idea", "__pycache__", "venv"})
+EXCLUDE_FILES = frozenset({".svg", ".png", ".exe", ".pyc", ".qm", ".jpg", ".jpeg", ".gif"})
+
+PREVIEW_LENGTH = 50
+
+# files per task handed to a worker, and tasks in flight per worker
+CHUNK_SIZE = 64
+QUEUE_DEPTH = 4
+
+# how often (seconds) is_cancelled() is asked while waiting for a worker
+POLL_INTERVAL = 0.05
+
+
+def exclude_dirs_for(search_project: bool) -> frozenset:
+    # 'Search in modules' also looks into the virtual environment
+    return EXCLUDE_DIRS - {"venv"} if search_project else EXCLUDE_DIRS
+
+
+def walk_files(
+    path: str, exclude_dirs: Iterable[str], exclude_files: Iterable[str], use_ignore_files: bool = True
+) -> Iterator[str]:
+    """
+    Full paths of the files below path, skipping excluded directory names and file suffixes and (if
+    use_ignore_files) what .gitignore/.ignore files leave out.  Directory listings are shared with every other
+    walk through epiccoder.project_files.
+    """
+    return project_files.walk(path, exclude_dirs, exclude_files, use_ignore_files)
+
+
+def required_literals(pattern: str) -> Optional[list[str]]:
+    """
+    Literal strings that every match of the regular expression pattern contains, or None if the pattern has
+    a top-level alternation or inline flags.  Conservative: group and character class contents, optional
+    characters and escapes like \\d are left out.
+    """
+    if "(?" in pattern:
+        return None
+
+    literals = []
+    run = []
+    depth = 0
+    last_literal = False  # whether the previous atom was appended to run
+
+    def end_run():
+        if run:
+            literals.append("".join(run))
+            run.clear()
+
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        i += 1
+        if c == "\\":
+            start = i
+            escaped = pattern[i : i + 1]
+            i += 1
+            if depth == 0 and escaped and not escaped.isalnum():
+                run.append(escaped)
+                last_literal = True
+            else:
+                # the digits or name of \x41, \u00e9, \U0001f600, \N{...}, octal \012 and back references are
+                # part of the escape, not literal text
+                if escaped in ESCAPE_ARGUMENT_LENGTHS:
+                    i += ESCAPE_ARGUMENT_LENGTHS[escaped]
+                elif escaped == "N" and pattern[i : i + 1] == "{":
+                    close = pattern.find("}", i)
+                    i = len(pattern) if close < 0 else close + 1
+                elif escaped.isdigit():
+                    while i < len(pattern) and pattern[i].isdigit() and i < start + 3:
+                        i += 1
+                end_run()
+                last_literal = False
+        elif c == "[":
+            # skip the character class, a ']' right after '[' or '[^' is part of it
+            if pattern[i : i + 1] == "^":
+                i += 1
+            if pattern[i : i + 1] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+            end_run()
+            last_literal = False
+        elif c == "(":
+            depth += 1
+            end_run()
+            last_literal = False
+        elif c == ")":
+            depth -= 1
+            last_literal = False
+        elif c == "|":
+            if depth == 0:
+                return None
+        elif c in "*?{":
+            # the previous atom may be absent from a match
+            if last_literal and run:
+                run.pop()
+            end_run()
+            if c == "{":
+                close = pattern.find("}", i)
+                i = len(pattern) if close < 0 else close + 1
+            last_literal = False
+        elif c == "+":
+            end_run()
+            last_literal = False
+        elif c in ".^$":
+            end_run()
+            last_literal = False
+        elif depth == 0:
+            run.append(c)
+            last_literal = True
+    end_run()
+    return literals
+
+
+class SearchQuery:
+    """
+    A search pattern compiled once, plus the plan for scanning files with it.
+
+    Files are searched as a whole for a literal, so nothing is decoded for lines without a hit; big files are
+    memory-mapped and searched in place with a bytes regex (the 'finder').  Patterns without regex
+    metacharacters (most of what gets typed into the search box) are that literal, and line and column are
+    worked out only for the hits.  For other patterns the literal is one every match must contain, and only
+    the lines it lands on are decoded and matched with the compiled pattern.  Patterns without such a literal
+    are matched line by line in text mode.
+
+    By default only the first match on a line is a hit; with all_matches every (non-overlapping) match is.
+    With literal the pattern is plain text, metacharacters included.
+    """
+
+    def __init__(
+        self,
+        pattern: str,
+        flags: int = re.IGNORECASE,
+        fast_path: bool = True,
+        all_matches: bool = False,
+        literal: bool = False,
+    ):
+        self.pattern = pattern
+        self.flags = flags
+        self.all_matches = all_matches
+        self.reg = re.compile(re.escape(pattern) if literal else pattern, flags)  # raises re.error if invalid
+
+        self.ignore_case = bool(flags & re.IGNORECASE)
+        # bytes patterns only fold ASCII case, so only ASCII literals are handed to the finder
+        self.literal: Optional[bytes] = None
+        self.prefilter: Optional[bytes] = None
+        if fast_path and pattern and pattern.isascii() and (literal or REGEX_METACHARACTERS.isdisjoint(pattern)):
+            self.literal = pattern.encode("ascii")
+        elif fast_path:
+            literals = [text for text in required_literals(self.reg.pattern) or () if text.isascii()]
+            if literals and len(max(literals, key=len)) >= PREFILTER_MIN_LENGTH:
+                self.prefilter = max(literals, key=len).encode("ascii")
+
+        needle = self.literal or self.prefilter
+        self.finder: Optional[re.Pattern] = None
+        if needle is not None:
+            self.finder = re.compile(re.escape(needle), re.IGNORECASE if self.ignore_case else 0)
+
+
+def line_matches(reg: re.Pattern, line: str, all_matches: bool) -> Iterator[re.Match]:
+    """The first match of reg on line, or every match; an empty match only counts as the first on its line."""
+    if not all_matches:
+        if m := reg.search(line):
+            yield m
+        return
+    for n, m in enumerate(reg.finditer(line)):
+        if n == 0 or m.end() > m.start():
+            yield m
+
+
+def match_lines(path: str, f: io.TextIOBase, reg: re.Pattern, all_matches: bool = False) -> list[Hit]:
+    """
+    Matches on every line of a text stream.  The stream should decode UTF-8 with errors="replace", as
+    scan_literal() decodes its hit lines, so a file that isn't UTF-8 is searched with U+FFFD for the bytes
+    that don't decode, on either path.
+    """
+    hits = []
+    name = os.path.basename(path)
+    for i, line in enumerate(f):
+        for m in line_matches(reg, line, all_matches):
+            hits.append((name, path, i, m.start(), m.end(), line[m.start() :].strip()[:PREVIEW_LENGTH]))
+    return hits
+
+
+def scan_lines(path: str, reg: re.Pattern, all_matches: bool = False) -> list[Hit]:
+    try:
+        with open(path, "r", encoding="utf8", errors="replace") as f:
+            return match_lines(path, f, reg, all_matches)
+    except OSError:
+        return []
+
+
+def count_line_breaks(data, start: int, end: int, universal_newlines: bool) -> int:
+    """Line breaks in data[start:end], counted in bounded slices so a mapped file is never copied whole."""
+    count = 0
+    for chunk_start in range(start, end, LINE_COUNT_CHUNK):
+        chunk_end = min(chunk_start + LINE_COUNT_CHUNK, end)
+        chunk = data[chunk_start:chunk_end]
+        if universal_newlines:
+            count += chunk.count(b"\n") + chunk.count(b"\r") - chunk.count(b"\r\n")
+            # a \r\n split between two slices is one line break
+            if chunk.endswith(b"\r") and chunk_end < end and data[chunk_end : chunk_end + 1] == b"\n":
+                count -= 1
+        else:
+            count += chunk.count(b"\n")
+    return count
+
+
+def hit_lines(data, find: Callable[[int], int]) -> Iterator[tuple[int, int, int, int]]:
+    """
+    (line number, line start, line end, hit position) of the first hit on each line of data (bytes or an mmap),
+    where find(start) returns the position of the next hit at or after start, or -1.  Lines end at \\n, \\r or
+    \\r\\n like in text mode; line end is the position of the line break.
+    """
+    # with \n-only line ends (the usual case) a line break is a single byte to look for
+    universal_newlines = data.find(b"\r") >= 0
+    size = len(data)
+
+    lineno = 0
+    counted = 0  # lineno is the number of line breaks in data[:counted]
+    pos = find(0)
+    while pos >= 0:
+        if universal_newlines:
+            line_start = max(data.rfind(b"\n", 0, pos), data.rfind(b"\r", 0, pos)) + 1
+            ends = [end for end in (data.find(b"\n", pos), data.find(b"\r", pos)) if end >= 0]
+            line_end = min(ends) if ends else size
+        else:
+            line_start = data.rfind(b"\n", 0, pos) + 1
+            line_end = data.find(b"\n", pos)
+            if line_end < 0:
+                line_end = size
+        lineno += count_line_breaks(data, counted, line_start, universal_newlines)
+        counted = line_start
+
+        yield lineno, line_start, line_end, pos
+
+        # only the first hit of a line counts
+        pos = find(line_end)
+
+
+def scan_literal(
+    path: str, data, find: Callable[[int], int], needle_length: int, all_matches: bool = False
+) -> list[Hit]:
+    """
+    Every line with a literal hit.  Hit lines are decoded as UTF-8 with errors="replace", like the lines
+    match_lines() reads, so bytes that don't decode count as one U+FFFD column each and don't end the scan.
+    """
+    hits = []
+    name = os.path.basename(path)
+    for lineno, line_start, line_end, pos in hit_lines(data, find):
+        column = 0
+        previous = line_start
+        while 0 <= pos < line_end:
+            # columns count characters, so only the stretch since the previous hit is decoded; the ASCII needle
+            # never starts inside a UTF-8 sequence, so the stretches decode as the whole line would
+            column += len(data[previous:pos].decode("utf8", errors="replace"))
+            line = data[pos:line_end].decode("utf8", errors="replace")
+            hits.append((name, path, lineno, column, column + needle_length, line.strip()[:PREVIEW_LENGTH]))
+            if not all_matches:
+                break
+            previous = pos
+            pos = find(pos + needle_length)
+    return hits
+
+
+def scan_prefiltered(
+    path: str, data, find: Callable[[int], int], reg: re.Pattern, all_matches: bool = False
+) -> list[Hit]:
+    """Matches of reg on every line with a prefilter hit (data must be pure ASCII)."""
+    hits = []
+    name = os.path.basename(path)
+    size = len(data)
+    for lineno, line_start, line_end, _ in hit_lines(data, find):
+        # text mode hands the line over with its line break translated to \n
+        line = data[line_start:line_end].decode("ascii") + ("\n" if line_end < size else "")
+        for m in line_matches(reg, line, all_matches):
+            hits.append((name, path, lineno, m.start(), m.end(), line[m.start() :].strip()[:PREVIEW_LENGTH]))
+    return hits
+
+
+def scan_buffer(path: str, data, query: SearchQuery, mapped: bool) -> Optional[list[Hit]]:
+    """Scan a file's bytes (or mapping) with the query's finder, None if it has to be scanned line by line."""
+    if data.find(b"\0", 0, 1024) >= 0:
+        return []
+
+    needle = query.literal or query.prefilter
+    if not query.ignore_case:
+        find = functools.partial(data.find, needle)
+    elif not mapped:
+        # lower() + find() beats a case-insensitive regex, at the price of one copy of the file
+        find = functools.partial(data.lower().find, needle.lower())
+    else:
+
+        def find(start: int) -> int:
+            m = query.finder.search(data, start)
+            return -1 if m is None else m.start()
+
+    if query.literal is not None:
+        return scan_literal(path, data, find, len(needle), query.all_matches)
+
+    # a non-ASCII file may hold text the pattern matches without containing the ASCII prefilter literal
+    # byte for byte (case folding), so those are matched line by line
+    is_ascii = NON_ASCII_RE.search(data) is None if mapped else data.isascii()
+    if is_ascii:
+        return scan_prefiltered(path, data, find, query.reg, query.all_matches)
+    return None
+
+
+def scan_file(path: str, query: SearchQuery) -> list[Hit]:
+    # a file already known to be binary (unchanged since) is not even opened
+    try:
+        st = os.stat(path)
+    except OSError:
+        return []
+    info = file_classifier.cached(path, st)
+    if info is not None and info.binary:
+        return []
+
+    if query.finder is None:
+        if info is None:
+            info = file_classifier.classify(path)
+        return [] if info is None or info.binary else scan_lines(path, query.reg, query.all_matches)
+
+    try:
+        with open(path, "rb") as f:
+            if st.st_size < MMAP_MIN_SIZE:
+                data = f.read()
+                file_classifier.classify_bytes(path, st, data)
+                hits = scan_buffer(path, data, query, mapped=False)
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    file_classifier.classify_bytes(path, st, data)
+                    hits = scan_buffer(path, data, query, mapped=True)
+    except (OSError, ValueError):
+        return []
+    return scan_lines(path, query.reg, query.all_matches) if hits is None else hits
+
+
+def scan_bytes(path: str, data: bytes, query: SearchQuery) -> list[Hit]:
+    """Scan the contents of path held in memory (e.g. an editor's unsaved text) the way scan_file() scans it."""
+    hits = None
+    if query.finder is not None:
+        hits = scan_buffer(path, data, query, mapped=False)
+    elif b"\0" in data[:1024]:
+        hits = []
+    if hits is None:
+        f = io.TextIOWrapper(io.BytesIO(data), encoding="utf8", errors="replace")
+        hits = match_lines(path, f, query.reg, query.all_matches)
+    return hits
+
+
+def scan_files(paths: list[str], query: SearchQuery) -> list[Hit]:
+    """Worker task: scan a chunk of files."""
+    hits = []
+    for path in paths:
+        hits.extend(scan_file(path, query))
+    return hits
+
+
+class HitStore:
+    """
+    Search hits kept as parallel arrays (file id, line number, start and end column) instead of one object per
+    hit.  Hits arrive grouped by file, so each file is stored once, with the range of its hits.  The previews
+    are kept UTF-8 encoded back to back in one buffer and only decoded for the rows asked for.
+    """
+
+    __slots__ = (
+        "paths",
+        "file_firsts",
+        "file_counts",
+        "file_ids",
+        "linenos",
+        "starts",
+        "ends",
+        "preview_data",
+        "preview_ends",
+    )
+
+    def __init__(self):
+        # per file
+        self.paths: list[str] = []
+        self.file_firsts = array("I")
+        self.file_counts = array("I")
+        # per hit
+        self.file_ids = array("I")
+        self.linenos = array("I")
+        self.starts = array("I")
+        self.ends = array("I")
+        # the previews, and where each one ends in preview_data
+        self.preview_data = bytearray()
+        self.preview_ends = array("I")
+
+    def __len__(self) -> int:
+        return len(self.linenos)
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def extend(self, hits: Iterable[Hit]) -> None:
+        for name, full_path, lineno, start, end, preview in hits:
+            if not self.paths or self.paths[-1] != full_path:
+                self.paths.append(full_path)
+                self.file_firsts.append(len(self.linenos))
+                self.file_counts.append(0)
+            self.file_counts[-1] += 1
+            self.file_ids.append(len(self.paths) - 1)
+            self.linenos.append(lineno)
+            self.starts.append(start)
+            self.ends.append(end)
+            self.preview_data += preview.encode("utf8", errors="surrogatepass")
+            self.preview_ends.append(len(self.preview_data))
+
+    def preview(self, row: int) -> str:
+        start = self.preview_ends[row - 1] if row else 0
+        return self.preview_data[start : self.preview_ends[row]].decode("utf8", errors="surrogatepass")
+
+    def hit(self, row: int) -> Hit:
+        path = self.paths[self.file_ids[row]]
+        return os.path.basename(path), path, self.linenos[row], self.starts[row], self.ends[row], self.preview(row)
+
+    def file_hit(self, file_id: int, n: int) -> Hit:
+        """The n-th hit in file file_id."""
+        return self.hit(self.file_firsts[file_id] + n)
+
+    def format_file(self, file_id: int) -> str:
+        count = self.file_counts[file_id]
+        return f"{os.path.basename(self.paths[file_id])} ({count} {'match' if count == 1 else 'matches'})"
+
+    def format_file_hit(self, file_id: int, n: int) -> str:
+        _, _, lineno, _, end, preview = self.file_hit(file_id, n)
+        return f"{lineno}:{end} - {preview} ..."
+
+
+def normalized_path(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def is_searched(
+    path: str, root: str, exclude_dirs: Iterable[str], exclude_files: Iterable[str], use_ignore_files: bool = True
+) -> bool:
+    """Whether a search below root with these exclusions would scan path."""
+    rel_path = os.path.relpath(normalized_path(path), normalized_path(root))
+    parts = Path(rel_path).parts
+    if not parts or parts[0] == os.pardir:
+        return False
+    if not set(exclude_dirs).isdisjoint(parts[:-1]) or Path(path).suffix in set(exclude_files):
+        return False
+    return not (use_ignore_files and project_files.is_ignored(root, path))
+
+
+def chunked(items: Iterable[str], size: int) -> Iterator[list[str]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def new_executor(workers: Optional[int] = None) -> Executor:
+    # workers are started fresh rather than forked: the editor forks from a process running Qt and other
+    # threads, whose locks a forked child can inherit held
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
+
+
+def wait_for(future: Future, is_cancelled: Callable[[], bool]) -> bool:
+    """Wait until future is done, asking is_cancelled() every POLL_INTERVAL; False if cancelled first."""
+    while not wait((future,), timeout=POLL_INTERVAL).done:
+        if is_cancelled():
+            return False
+    return True
+
+
+def search(
+    path: str,
+    query: SearchQuery,
+    executor: Executor,
+    exclude_dirs: Iterable[str] = EXCLUDE_DIRS,
+    exclude_files: Iterable[str] = EXCLUDE_FILES,
+    workers: Optional[int] = None,
+    is_cancelled: Callable[[], bool] = lambda: False,
+    paths: Optional[Iterable[str]] = None,
+    skip_paths: Iterable[str] = (),
+    use_ignore_files: bool = True,
+) -> Iterator[list[Hit]]:
+    """
+    Scan every file below path for query on executor, yield the hits of each chunk of files in walk order.
+    If paths is given (e.g. the candidates from a search index), only those files are scanned, in that order.
+    Files in skip_paths (e.g. those searched in an editor's unsaved text instead) are left out.
+
+    Stops (and cancels queued chunks) as soon as is_cancelled() returns True or the caller stops iterating.
+    """
+    max_in_flight = (workers or os.cpu_count() or 1) * QUEUE_DEPTH
+    in_flight = deque()
+    try:
+        if paths is None:
+            paths = walk_files(path, exclude_dirs, exclude_files, use_ignore_files)
+        skip_paths = {normalized_path(p) for p in skip_paths}
+        if skip_paths:
+            paths = (p for p in paths if normalized_path(p) not in skip_paths)
+        for chunk in chunked(paths, CHUNK_SIZE):
+            if is_cancelled():
+                return
+            in_flight.append(executor.submit(scan_files, chunk, query))
+            while len(in_flight) >= max_in_flight:
+                if not wait_for(in_flight[0], is_cancelled):
+                    return
+                yield in_flight.popleft().result()
+                if is_cancelled():
+                    return
+        while in_flight:
+            if not wait_for(in_flight[0], is_cancelled):
+                return
+            yield in_flight.popleft().result()
+            if is_cancelled():
+                return
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def glob_regex(globs: Iterable[str]) -> Optional[re.Pattern]:
+    """
+    One regex for fnmatch-style globs, None if there are none.  A glob with a '/' is matched against the path
+    relative to the searched folder (with '/' separators, and '*' crossing them), any other against the file
+    name.
+    """
+    parts = []
+    for glob in globs:
+        glob = os.path.normcase(glob).replace(os.sep, "/")
+        prefix = "" if "/" in glob else "(?:.*/)?"
+        parts.append(prefix + fnmatch.translate(glob.lstrip("/")))
+    return re.compile("|".join(parts)) if parts else None
+
+
+def filter_paths(
+    paths: Iterable[str], root: str, include: Iterable[str] = (), exclude: Iterable[str] = ()
+) -> Iterator[str]:
+    """The paths (below root) matching one of the include globs, if any, and none of the exclude globs."""
+    include_reg = glob_regex(include)
+    exclude_reg = glob_regex(exclude)
+    if include_reg is None and exclude_reg is None:
+        yield from paths
+        return
+    for path in paths:
+        rel_path = os.path.normcase(os.path.relpath(path, root)).replace(os.sep, "/")
+        if (include_reg is None or include_reg.match(rel_path)) and not (exclude_reg and exclude_reg.match(rel_path)):
+            yield path
+
+
+def search_tree(
+    path: str,
+    query: SearchQuery,
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+    workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    exclude_dirs: Iterable[str] = EXCLUDE_DIRS,
+    exclude_files: Iterable[str] = EXCLUDE_FILES,
+    use_ignore_files: bool = True,
+) -> Iterator[list[Hit]]:
+    """
+    search() for scripts: the files below path narrowed by include/exclude globs (see glob_regex()), scanned
+    on executor, or on a process pool of workers created for this search and shut down after it.
+    """
+    paths = filter_paths(walk_files(path, exclude_dirs, exclude_files, use_ignore_files), path, include, exclude)
+    own_executor = executor is None
+    if own_executor:
+        executor = new_executor(workers)
+    try:
+        yield from search(path, query, executor, workers=workers, paths=paths)
+    finally:
+        if own_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
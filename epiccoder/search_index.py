@@ -0,0 +1,380 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Persistent trigram index that narrows a project search to the files that can contain a match.
+#
+# For every text file below a root folder the index keeps the (lower-cased, ASCII) trigrams that occur inside
+# runs of word characters, in an inverted index trigram -> file ids.  A query is reduced to the trigrams every
+# match must contain (see required_trigrams()), and only files containing all of them are scanned.  Entries
+# are keyed on the file's mtime and size, refreshed incrementally, and pickled under the user cache directory.
+# Files added or changed since the last refresh are always scanned, so a stale index costs time, not hits.
+# Only project folders (see ProjectFiles.is_project_folder()) with up to MAX_FILES files and MAX_BYTES in them
+# are indexed; searches in other folders scan every file.  The cache directory itself is never indexed.
+# While the project folder is watched (epiccoder.file_watcher), changed files are re-indexed one by one with
+# update_files() instead of refreshing the whole folder.
+
+import hashlib
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+from epiccoder.file_info import file_classifier
+from epiccoder.project_files import project_files
+from epiccoder.search_core import EXCLUDE_FILES, exclude_dirs_for, is_searched, required_literals, walk_files
+
+INDEX_VERSION = 1
+
+# least time (seconds) between writes of the cache file for changes reported by the file watcher
+SAVE_INTERVAL = 30
+
+# folders with more files than this, or more bytes in them, are not indexed
+MAX_FILES = 100_000
+MAX_BYTES = 1024**3
+
+# files are read and indexed this much at a time, so indexing a big file takes little memory
+READ_SIZE = 1024 * 1024
+
+WORD_RE = re.compile(rb"[a-z0-9_]{3,}")
+QUERY_WORD_RE = re.compile(r"[a-z0-9_]{3,}")
+
+
+def user_cache_dir() -> Path:
+    if sys.platform == "win32":
+        base = Path(os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local")
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return base / "epiccoder"
+
+
+def word_trigrams(words: Iterable) -> set:
+    return {word[i : i + 3] for word in words for i in range(len(word) - 2)}
+
+
+def file_trigrams(data: bytes) -> set[bytes]:
+    # unique words first: the vocabulary of a file is much smaller than the file itself
+    return word_trigrams(set(WORD_RE.findall(data.lower())))
+
+
+def required_trigrams(pattern: str, literal: bool = False) -> Optional[set[bytes]]:
+    """Trigrams a file must contain to match pattern (case-insensitively), None if the query can't be narrowed."""
+    literals = [pattern] if literal else required_literals(pattern)
+    if literals is None:
+        return None
+    words = [word.encode("ascii") for text in literals for word in QUERY_WORD_RE.findall(text.lower())]
+    trigrams = word_trigrams(words)
+    return trigrams or None
+
+
+class TrigramIndex:
+    """
+    Trigram index of the text files below root.  Thread-safe: refresh() can run in a background thread while
+    candidates() is answered from the state of the last completed refresh.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.lock = threading.Lock()
+        # relative path -> (file id, mtime_ns, size); ids of removed or changed files are left in the postings
+        # and dropped at query time, until too many of them make rebuild() worthwhile
+        self.files: dict[str, tuple[int, int, int]] = {}
+        self.paths: list[Optional[str]] = []  # file id -> relative path, None once the id is dead
+        self.postings: dict[bytes, set[int]] = {}
+        self.ready = False
+        # whether there are changes save() has not written yet, and when it last did
+        self.unsaved = False
+        self.saved_at = 0.0
+
+    @property
+    def cache_path(self) -> Path:
+        digest = hashlib.sha1(os.path.abspath(self.root).encode("utf-8", errors="surrogateescape")).hexdigest()
+        return user_cache_dir() / "index" / f"{digest}.pickle"
+
+    def cache_dir(self) -> Optional[str]:
+        """The cache directory relative to root, ending in a separator, if it is below root (e.g. root is home)."""
+        rel_dir = os.path.relpath(user_cache_dir(), self.root)
+        if rel_dir == os.pardir or rel_dir.startswith(os.pardir + os.sep):
+            return None
+        return os.path.join(rel_dir, "")
+
+    def load(self) -> bool:
+        try:
+            with open(self.cache_path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return False
+        if state.get("version") != INDEX_VERSION or state.get("root") != self.root:
+            return False
+        with self.lock:
+            self.files, self.paths, self.postings = state["files"], state["paths"], state["postings"]
+        return True
+
+    def save(self) -> bool:
+        """
+        Write the index to its cache file; whether it was written.  If the cache directory can't be written
+        (read-only, full) the index is kept in memory only, marked unsaved, and saving is tried again later.
+        """
+        path = self.cache_path
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with self.lock:
+            state = {
+                "version": INDEX_VERSION,
+                "root": self.root,
+                "files": self.files,
+                "paths": self.paths,
+                "postings": self.postings,
+            }
+            self.saved_at = time.monotonic()
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp, "wb") as f:
+                    pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            except OSError:
+                self.discard(tmp)
+                self.unsaved = True
+                return False
+            self.unsaved = False
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            self.discard(tmp)
+            self.unsaved = True
+            return False
+        return True
+
+    @staticmethod
+    def discard(tmp: Path) -> None:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+    def add_file(self, rel_path: str, mtime_ns: int, size: int, trigrams: set[bytes]) -> None:
+        # caller holds the lock
+        self.remove_file(rel_path)
+        file_id = len(self.paths)
+        self.paths.append(rel_path)
+        self.files[rel_path] = (file_id, mtime_ns, size)
+        for trigram in trigrams:
+            self.postings.setdefault(trigram, set()).add(file_id)
+
+    def remove_file(self, rel_path: str) -> None:
+        # caller holds the lock
+        entry = self.files.pop(rel_path, None)
+        if entry is not None:
+            self.paths[entry[0]] = None
+
+    def refresh(self, is_cancelled=lambda: False) -> bool:
+        """
+        Bring the index up to date with the files on disk, re-reading only new and changed files.  Returns
+        False if it was cancelled part way (what was indexed so far is kept).
+        """
+        if not project_files.is_project_folder(self.root):
+            self.disable()
+            return True
+        if not self.ready and not self.files:
+            self.load()
+
+        # the folder is listed and measured before anything is read, so one over the caps costs at most
+        # MAX_FILES stats.  Everything any search may scan is indexed, ignored files too (candidates() filters).
+        found = []
+        total_bytes = 0
+        cache_dir = self.cache_dir()
+        for path in walk_files(self.root, exclude_dirs_for(True), EXCLUDE_FILES, use_ignore_files=False):
+            if is_cancelled():
+                return False
+            rel_path = os.path.relpath(path, self.root)
+            if cache_dir is not None and rel_path.startswith(cache_dir):
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found.append((path, rel_path, st))
+            total_bytes += st.st_size
+            if len(found) > MAX_FILES or total_bytes > MAX_BYTES:
+                self.disable()
+                return True
+
+        seen = set()
+        changed = False
+        for path, rel_path, st in found:
+            if is_cancelled():
+                return False
+            seen.add(rel_path)
+            changed |= self.index_file(path, rel_path, st)
+
+        with self.lock:
+            for rel_path in set(self.files) - seen:
+                self.remove_file(rel_path)
+                changed = True
+            if len(self.paths) > 2 * max(len(self.files), 1000):
+                self.rebuild()
+            self.ready = True
+        if changed or self.unsaved:
+            self.save()
+        return True
+
+    def disable(self) -> None:
+        """Drop the index and its cache file, for a root that is not indexed: searches below it scan every file."""
+        with self.lock:
+            self.files, self.paths, self.postings = {}, [], {}
+            self.ready = False
+            self.unsaved = False
+        try:
+            os.unlink(self.cache_path)
+        except OSError:
+            pass
+
+    def index_file(self, path: str, rel_path: str, st: Optional[os.stat_result] = None) -> bool:
+        """(Re-)index the file at path (st: its stat, if just taken) if it is new or changed; whether it was."""
+        if st is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False
+        entry = self.files.get(rel_path)
+        if entry is not None and entry[1:] == (st.st_mtime_ns, st.st_size):
+            return False
+        info = file_classifier.cached(path, st)
+        trigrams = set()
+        if info is None or not info.binary:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read(READ_SIZE)
+                    info = file_classifier.classify_bytes(path, st, data)
+                    while data and not info.binary:
+                        trigrams |= file_trigrams(data)
+                        more = f.read(READ_SIZE)
+                        # the last two bytes again, for the trigrams across the boundary
+                        data = data[-2:] + more if more else b""
+            except OSError:
+                return False
+        with self.lock:
+            self.add_file(rel_path, st.st_mtime_ns, st.st_size, trigrams)
+        return True
+
+    def update_files(self, paths: Iterable[str]) -> None:
+        """
+        Bring just these files (full paths below root, e.g. reported by a file watcher) up to date: index new and
+        changed ones and drop the ones that are gone.  The cache file is written at most every SAVE_INTERVAL
+        seconds from here; a change not saved yet is picked up by the refresh() after the next load().
+        """
+        exclude_dirs = exclude_dirs_for(True)
+        cache_dir = self.cache_dir()
+        changed = False
+        for path in paths:
+            rel_path = os.path.relpath(path, self.root)
+            if cache_dir is not None and rel_path.startswith(cache_dir):
+                # written by save() itself
+                continue
+            if os.path.isfile(path) and is_searched(path, self.root, exclude_dirs, EXCLUDE_FILES, False):
+                changed |= self.index_file(path, rel_path)
+            elif rel_path in self.files:
+                with self.lock:
+                    self.remove_file(rel_path)
+                changed = True
+        if not changed:
+            return
+        with self.lock:
+            if len(self.paths) > 2 * max(len(self.files), 1000):
+                self.rebuild()
+        self.unsaved = True
+        if time.monotonic() - self.saved_at >= SAVE_INTERVAL:
+            self.save()
+
+    def rebuild(self) -> None:
+        """Renumber the live files and drop dead ids from the postings (caller holds the lock)."""
+        new_ids = {}
+        paths = []
+        for rel_path, (file_id, mtime_ns, size) in self.files.items():
+            new_ids[file_id] = len(paths)
+            self.files[rel_path] = (len(paths), mtime_ns, size)
+            paths.append(rel_path)
+        postings = {}
+        for trigram, ids in self.postings.items():
+            live = {new_ids[i] for i in ids if i in new_ids}
+            if live:
+                postings[trigram] = live
+        self.paths = paths
+        self.postings = postings
+
+    def candidates(
+        self,
+        pattern: str,
+        literal: bool = False,
+        search_project: bool = True,
+        use_ignore_files: bool = False,
+        check_changes: bool = True,
+        changed: Iterable[str] = (),
+    ) -> Optional[list[str]]:
+        """
+        Full paths of the files that may match pattern, in walk order, or None if the index can't narrow this
+        query (then every file has to be scanned).
+
+        Besides the indexed files containing the query's trigrams these are the files the index doesn't know
+        yet and, with check_changes, the files changed since they were indexed.  The folder is walked from the
+        cached directory listings for that, so only changed directories are listed again and each file costs
+        a stat.  Without check_changes (the caller keeps the index current, e.g. from a file watcher) nothing
+        is stat'ed; changed then lists the files and directories (full paths) reported changed but possibly
+        not re-indexed yet, and their files are included whatever their trigrams.
+        """
+        trigrams = required_trigrams(pattern, literal)
+        if trigrams is None or not self.ready:
+            return None
+        with self.lock:
+            # rarest trigram first keeps the intersection small
+            postings = sorted((self.postings.get(t, set()) for t in trigrams), key=len)
+            ids = set(postings[0])
+            for p in postings[1:]:
+                ids &= p
+                if not ids:
+                    break
+            matching = {self.paths[i] for i in ids}
+            files = self.files.copy()
+
+        changed = set(changed)
+        paths = []
+        cache_dir = self.cache_dir()
+        prefix = os.path.join(self.root, "")
+        for path in walk_files(self.root, exclude_dirs_for(search_project), EXCLUDE_FILES, use_ignore_files):
+            # walked paths start with the root as given; relpath() is much slower than cutting it off
+            rel_path = path[len(prefix) :] if path.startswith(prefix) else os.path.relpath(path, self.root)
+            if cache_dir is not None and rel_path.startswith(cache_dir):
+                continue
+            entry = files.get(rel_path)
+            if entry is None or rel_path in matching:
+                paths.append(path)
+            elif changed and (path in changed or os.path.dirname(path) in changed):
+                paths.append(path)
+            elif check_changes:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if entry[1:] != (st.st_mtime_ns, st.st_size):
+                    paths.append(path)
+        return paths
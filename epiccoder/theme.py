@@ -0,0 +1,228 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Color and font tables for every lexer the editor uses.
+#
+# Each table is built once per process (the first time a tab needs it) and shared by all later tabs, so
+# opening a new tab only copies prebuilt QColor/QFont values into its lexer.
+
+import functools
+from typing import Optional
+
+from PyQt5.Qsci import QsciLexer, QsciLexerCPP, QsciLexerPython
+from PyQt5.QtGui import QColor, QFont
+
+from epiccoder.lexer_core import PPSStyle, PyStyle, TextStyle
+
+# style number QsciLexer.setColor()/setPaper()/setFont() read as "every style of the lexer"
+ALL_STYLES = -1
+
+
+class Theme:
+    def __init__(
+        self,
+        color: QColor,
+        paper: QColor,
+        font: QFont,
+        colors: dict[int, QColor],
+        fonts: Optional[dict[int, QFont]] = None,
+        style_paper: Optional[QColor] = None,
+        style_font: Optional[QFont] = None,
+    ):
+        self.color = color
+        self.paper = paper
+        self.font = font
+        self.colors = colors
+        self.fonts = fonts or {}
+        # applied to every style at once before the per-style entries, if given
+        self.style_paper = style_paper
+        self.style_font = style_font
+
+    def apply(self, lexer: QsciLexer) -> None:
+        lexer.setDefaultColor(self.color)
+        lexer.setDefaultPaper(self.paper)
+        lexer.setDefaultFont(self.font)
+
+        if self.style_paper is not None:
+            lexer.setPaper(self.style_paper, ALL_STYLES)
+        if self.style_font is not None:
+            lexer.setFont(self.style_font, ALL_STYLES)
+
+        for style, color in self.colors.items():
+            lexer.setColor(color, style)
+        for style, font in self.fonts.items():
+            lexer.setFont(font, style)
+
+
+def make_prs_theme() -> Theme:
+    light_gray = QColor("#abb2bf")
+    charcoal = QColor("#282c34")
+
+    bright_green = QColor("#a6e22b")  # (166 , 226 , 43)
+    red = QColor("#f9245e")  # (249 , 36 , 94)
+    teal = QColor("#c678dd")  # (198 , 120 , 221)
+    brown = QColor("#736643")  # (115 , 102 , 67)
+    purple = QColor("#ac7db8")  # (172 , 125 , 184)
+    yellow = QColor("#e7db74")  # (231 , 219 , 116)
+    orange = QColor("#fc9221")  # (252 , 146 , 33)
+    light_blue = QColor("#6495ed")  # (100 , 149 , 237)
+
+    normal_font = QFont("Consolas", 14)
+    bold_font = QFont("Consolas", 14, weight=QFont.Bold)
+
+    return Theme(
+        color=light_gray,
+        paper=charcoal,
+        font=normal_font,
+        colors={
+            PPSStyle.DEFAULT: light_gray,
+            PPSStyle.PARENS: light_gray,
+            PPSStyle.RULE_SECTION: yellow,
+            PPSStyle.COMPARISON: bright_green,
+            PPSStyle.DIRECTIVE: red,
+            PPSStyle.ARCHITECTURE: teal,
+            PPSStyle.COMMENT: brown,
+            PPSStyle.NUMBER: purple,
+            PPSStyle.RULE_NAME: yellow,
+            PPSStyle.VARIABLE: orange,
+            PPSStyle.KEYWORD: light_blue,
+        },
+        style_paper=charcoal,
+        style_font=normal_font,
+        fonts={
+            PPSStyle.RULE_SECTION: bold_font,
+            PPSStyle.COMPARISON: bold_font,
+            PPSStyle.DIRECTIVE: bold_font,
+            PPSStyle.ARCHITECTURE: bold_font,
+            PPSStyle.RULE_NAME: bold_font,
+            PPSStyle.KEYWORD: bold_font,
+        },
+    )
+
+
+def make_text_theme() -> Theme:
+    light_gray = QColor("#abb2bf")
+    charcoal = QColor("#282c34")
+    purple = QColor("#ac7db8")
+
+    return Theme(
+        color=light_gray,
+        paper=charcoal,
+        font=QFont("Consolas", 14),
+        colors={TextStyle.DEFAULT: light_gray, TextStyle.NUMBER: purple},
+        style_paper=charcoal,
+    )
+
+
+def make_py_custom_theme() -> Theme:
+    white = QColor("#ffffff")  # "#abb2bf"
+    charcoal = QColor("#282c34")
+    purple = QColor("#c678dd")  # (198 , 120 , 221)
+    blue = QColor("#61afd1")  # (97 , 175 , 209)
+    bold_font = QFont("Consolas", 14, QFont.Bold)
+
+    return Theme(
+        color=white,
+        paper=charcoal,
+        font=QFont("Consolas", 14),
+        colors={
+            PyStyle.DEFAULT: white,
+            PyStyle.KEYWORD: purple,
+            PyStyle.TYPES: QColor("#56b6c2"),  # (86 , 182 , 194)
+            PyStyle.STRING: QColor("#98c379"),  # (152 , 195 , 121)
+            PyStyle.KEYARGS: purple,
+            PyStyle.BRACKETS: purple,
+            PyStyle.COMMENTS: QColor("#777777"),  # (119 , 119 , 119)
+            PyStyle.CONSTANTS: QColor("#d19a5e"),  # (209 , 154 , 94)
+            PyStyle.FUNCTIONS: blue,
+            PyStyle.CLASSES: QColor("#C68F55"),  # (198 , 143 , 85)
+            PyStyle.FUNCTION_DEF: blue,
+        },
+        style_paper=charcoal,
+        fonts={
+            PyStyle.DEFAULT: bold_font,
+            PyStyle.KEYWORD: bold_font,
+            PyStyle.CLASSES: bold_font,
+            PyStyle.FUNCTION_DEF: bold_font,
+        },
+    )
+
+
+def make_python_theme() -> Theme:
+    string = QColor("#91C71E")
+    comment = QColor("#8C8C8C")
+    font = QFont("Consolas", 14)
+
+    return Theme(
+        color=QColor("#abb2bf"),
+        paper=QColor("#282c34"),
+        font=font,
+        colors={
+            QsciLexerPython.Number: QColor("#4397E0"),
+            QsciLexerPython.Keyword: QColor("#F18622"),
+            QsciLexerPython.DoubleQuotedString: string,
+            QsciLexerPython.SingleQuotedString: string,
+            QsciLexerPython.TripleDoubleQuotedString: string,
+            QsciLexerPython.TripleSingleQuotedString: string,
+            QsciLexerPython.FunctionMethodName: QColor("#F0A91D"),
+            QsciLexerPython.Comment: comment,
+            QsciLexerPython.CommentBlock: comment,
+            QsciLexerPython.Identifier: QColor("#B45DD9"),
+        },
+        style_font=font,
+    )
+
+
+def make_cpp_theme() -> Theme:
+    string = QColor("#91C71E")
+    comment = QColor("#8C8C8C")
+    font = QFont("Consolas", 14)
+
+    return Theme(
+        color=QColor("#abb2bf"),
+        paper=QColor("#282c34"),
+        font=font,
+        colors={
+            QsciLexerCPP.Number: QColor("#4397E0"),
+            QsciLexerCPP.Keyword: QColor("#F18622"),
+            QsciLexerCPP.DoubleQuotedString: string,
+            QsciLexerCPP.SingleQuotedString: string,
+            QsciLexerCPP.Comment: comment,
+            QsciLexerCPP.CommentLine: comment,
+            QsciLexerCPP.Identifier: QColor("#B45DD9"),
+            QsciLexerCPP.Operator: QColor("white"),
+        },
+        style_font=font,
+    )
+
+
+THEME_BUILDERS = {
+    "prs": make_prs_theme,
+    "text": make_text_theme,
+    "py_custom": make_py_custom_theme,
+    "python": make_python_theme,
+    "cpp": make_cpp_theme,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_theme(language: str) -> Theme:
+    """The shared Theme for language (a key of THEME_BUILDERS), built on first use."""
+    return THEME_BUILDERS[language]()
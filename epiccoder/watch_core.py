@@ -0,0 +1,151 @@
+"""
+EPICcoder is a minimal programmer's text editor created for use with the
+EPIC, EPICpy and pyEPIC simulation environments.
+
+Copyright (C) 2022-2025 Travis L. Seymour, PhD
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# Qt-independent bookkeeping for the project folder watcher (epiccoder.file_watcher.ProjectWatcher).
+#
+# File system watchers report that a directory changed, not what changed in it, so the watcher keeps a
+# snapshot of the tree: for each directory the (mtime, size) of its files and the names of its subdirectories.
+# Comparing a changed directory with its snapshot turns the event into the files added, removed or replaced
+# in it (e.g. saved by writing a temporary file and renaming it over the old one), and into the directories
+# and files to start or stop watching.
+
+import os
+from typing import Callable, Iterable, Optional
+
+from epiccoder.project_files import project_files
+
+# (full paths of the files added, changed or removed; paths to start watching; paths to stop watching)
+Changes = tuple[list[str], list[str], list[str]]
+
+# a directory's file name -> (mtime_ns, size), and its subdirectory names
+DirectoryState = tuple[dict[str, tuple[int, int]], frozenset]
+
+
+class TreeSnapshot:
+    """
+    The directories and files below root, leaving out excluded directory names and file suffixes, and the
+    directories at exclude_paths (full paths, e.g. the editor's own cache directory).
+    """
+
+    def __init__(
+        self,
+        root: str,
+        exclude_dirs: Iterable[str] = (),
+        exclude_files: Iterable[str] = (),
+        exclude_paths: Iterable[str] = (),
+    ):
+        self.root = root
+        self.exclude_dirs = frozenset(exclude_dirs)
+        self.exclude_files = frozenset(exclude_files)
+        self.exclude_paths = frozenset(os.path.normcase(os.path.abspath(path)) for path in exclude_paths)
+        self.dirs: dict[str, DirectoryState] = {}
+
+    def look(self, directory: str, changed: bool = False) -> DirectoryState:
+        if changed:
+            # it may have changed again within the resolution of its mtime, which would keep the cached listing
+            project_files.forget(directory)
+        files, subdirs, _ = project_files.listing(directory)
+        stats = {}
+        for name, suffix, path in files:
+            if suffix in self.exclude_files:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stats[name] = (st.st_mtime_ns, st.st_size)
+        return stats, frozenset(
+            name
+            for name, path in subdirs
+            if name not in self.exclude_dirs
+            and not (self.exclude_paths and os.path.normcase(os.path.abspath(path)) in self.exclude_paths)
+        )
+
+    def add(
+        self, directory: str, limit: Optional[int] = None, is_cancelled: Callable[[], bool] = lambda: False
+    ) -> Optional[tuple[list[str], list[str]]]:
+        """
+        Take in directory and everything below it; returns the full paths of the directories and files found,
+        or None as soon as there are more than limit of them or is_cancelled() returns True (what was taken in
+        so far stays).
+        """
+        dirs, files = [], []
+        stack = [directory]
+        while stack:
+            if is_cancelled():
+                return None
+            directory = stack.pop()
+            stats, subdirs = self.dirs[directory] = self.look(directory)
+            dirs.append(directory)
+            files.extend(os.path.join(directory, name) for name in stats)
+            stack.extend(os.path.join(directory, name) for name in subdirs)
+            if limit is not None and len(dirs) + len(files) > limit:
+                return None
+        return dirs, files
+
+    def remove(self, directory: str) -> tuple[list[str], list[str]]:
+        """Forget directory and everything below it; returns the full paths of the directories and files it had."""
+        dirs, files = [], []
+        stack = [directory]
+        while stack:
+            directory = stack.pop()
+            state = self.dirs.pop(directory, None)
+            if state is None:
+                continue
+            dirs.append(directory)
+            files.extend(os.path.join(directory, name) for name in state[0])
+            stack.extend(os.path.join(directory, name) for name in state[1])
+        return dirs, files
+
+    def directory_changed(self, directory: str) -> Changes:
+        """What changed in directory (and below its new or removed subdirectories) since it was last looked at."""
+        old = self.dirs.get(directory)
+        if old is None:
+            return [], [], []
+        old_stats, old_subdirs = old
+        stats, subdirs = self.dirs[directory] = self.look(directory, changed=True)
+
+        changed = [os.path.join(directory, name) for name, st in stats.items() if old_stats.get(name) != st]
+        watch = [os.path.join(directory, name) for name in stats.keys() - old_stats.keys()]
+        unwatch = [os.path.join(directory, name) for name in old_stats.keys() - stats.keys()]
+        changed.extend(unwatch)
+        for name in subdirs - old_subdirs:
+            dirs, files = self.add(os.path.join(directory, name))
+            changed.extend(files)
+            watch.extend(dirs + files)
+        for name in old_subdirs - subdirs:
+            dirs, files = self.remove(os.path.join(directory, name))
+            changed.extend(files)
+            unwatch.extend(dirs + files)
+        return changed, watch, unwatch
+
+    def file_changed(self, path: str) -> bool:
+        """Record the new state of a file reported changed; whether it is a file of the tree that still exists."""
+        state = self.dirs.get(os.path.dirname(path))
+        name = os.path.basename(path)
+        if state is None or name not in state[0]:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            # gone; the event for its directory removes it
+            return False
+        state[0][name] = (st.st_mtime_ns, st.st_size)
+        return True